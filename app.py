@@ -15,11 +15,9 @@ from streamlit_js_eval import streamlit_js_eval
 
 from src.features import KeystrokeFeatures, extract_features, get_feature_names
 from src.capture import KeystrokeSession, parse_js_keystroke_data
-from src.model import (
-    KeystrokeAuthenticator, 
-    load_users_from_json, 
-    save_user_to_json
-)
+from src.model import SQLiteUserStore, migrate_json_to_sqlite
+from src.registry import ModelRegistry
+from src.training import TrainingService
 from src.utils import (
     get_random_paragraph,
     validate_username,
@@ -310,25 +308,38 @@ st.markdown("""
 
 # Initialize paths
 ensure_directories()
-DATA_PATH = get_data_path() / 'users.json'
-MODEL_PATH = get_models_path() / 'keystroke_model.joblib'
-
-# Initialize session state
-if 'authenticator' not in st.session_state:
-    st.session_state.authenticator = KeystrokeAuthenticator(MODEL_PATH)
-    loaded = False
-    if MODEL_PATH.exists():
-        loaded = st.session_state.authenticator.load()
-    
-    # Auto-train if not loaded but sample data exists
-    if not loaded and DATA_PATH.exists():
-        try:
-            user_data = load_users_from_json(DATA_PATH)
-            if len(user_data) >= 2:
-                st.session_state.authenticator.train(user_data)
-                st.session_state.authenticator.save()
-        except Exception:
-            pass
+LEGACY_DATA_PATH = get_data_path() / 'users.json'
+MODEL_REGISTRY = ModelRegistry(get_models_path() / 'registry')
+
+
+@st.cache_resource
+def get_user_store() -> SQLiteUserStore:
+    """Process-wide user store, seeded once from the legacy users.json."""
+    store = SQLiteUserStore(get_data_path() / 'users.db')
+    if store.count_users() == 0 and LEGACY_DATA_PATH.exists():
+        migrate_json_to_sqlite(LEGACY_DATA_PATH, store.db_path)
+    return store
+
+
+@st.cache_resource
+def get_training_service() -> TrainingService:
+    """Process-wide background trainer shared by all sessions."""
+    service = TrainingService(USER_STORE, MODEL_REGISTRY)
+    
+    # Auto-train if no model was saved but sample data exists
+    if not service.authenticator.is_trained and USER_STORE.count_users() >= 2:
+        service.request_retrain(debounce=0)
+    
+    return service
+
+
+USER_STORE = get_user_store()
+training_service = get_training_service()
+
+# Initialize session state; every rerun picks up the latest published
+# model, including versions activated by a rollback
+training_service.refresh()
+st.session_state.authenticator = training_service.authenticator
 
 if 'registration_samples' not in st.session_state:
     st.session_state.registration_samples = []
@@ -388,9 +399,55 @@ def get_keystroke_capture_js():
             charCount.textContent = input.value.length;
         });
         
+        // Packed wire format, decoded by src.capture.unpack_keystroke_data:
+        // version byte, interned key table, then per event a varint of
+        // (key index << 1 | is keydown) and a zigzag varint time delta in us
+        const writeVarint = (out, value) => {
+            // Arithmetic instead of bitwise ops, which truncate to 32 bits
+            while (value >= 0x80) {
+                out.push((value % 0x80) + 0x80);
+                value = Math.floor(value / 0x80);
+            }
+            out.push(value);
+        };
+        
+        const encodeKeystrokeEvents = (events) => {
+            const keyIndex = new Map();
+            const body = [];
+            let prevUs = 0;
+            
+            for (const event of events) {
+                if (!keyIndex.has(event.key)) {
+                    keyIndex.set(event.key, keyIndex.size);
+                }
+                const timeUs = Math.round(event.time * 1000);
+                const delta = timeUs - prevUs;
+                prevUs = timeUs;
+                
+                writeVarint(body, keyIndex.get(event.key) * 2 + (event.type === 'keydown' ? 1 : 0));
+                writeVarint(body, delta >= 0 ? 2 * delta : -2 * delta - 1);
+            }
+            
+            const out = [1];
+            const utf8 = new TextEncoder();
+            writeVarint(out, keyIndex.size);
+            for (const key of keyIndex.keys()) {
+                const bytes = utf8.encode(key);
+                writeVarint(out, bytes.length);
+                out.push(...bytes);
+            }
+            writeVarint(out, events.length);
+            
+            let binary = '';
+            for (const byte of out.concat(body)) {
+                binary += String.fromCharCode(byte);
+            }
+            return btoa(binary);
+        };
+        
         // Make data available to Streamlit
         window.getKeystrokeData = () => ({
-            events: keystrokeEvents,
+            packed: encodeKeystrokeEvents(keystrokeEvents),
             text: input.value
         });
         
@@ -423,13 +480,9 @@ def render_sidebar():
         st.markdown("### 📈 System Stats")
         
         # Load user count
-        if DATA_PATH.exists():
-            try:
-                user_data = load_users_from_json(DATA_PATH)
-                st.metric("Registered Users", len(user_data))
-            except Exception:
-                st.metric("Registered Users", 0)
-        else:
+        try:
+            st.metric("Registered Users", len(USER_STORE.cached_users()))
+        except Exception:
             st.metric("Registered Users", 0)
         
         model_status = "✅ Trained" if st.session_state.authenticator.is_trained else "⏳ Not Trained"
@@ -554,11 +607,9 @@ def render_register():
             return
         
         # Check if user exists
-        if DATA_PATH.exists():
-            existing_users = load_users_from_json(DATA_PATH)
-            if username.lower() in [u.lower() for u in existing_users.keys()]:
-                st.warning(f"User '{username}' already exists. Choose a different name.")
-                return
+        if username.lower() in USER_STORE.cached_users():
+            st.warning(f"User '{username}' already exists. Choose a different name.")
+            return
         
         st.success(f"✅ Username '{username}' is available!")
     else:
@@ -575,19 +626,15 @@ def render_register():
         
         if st.button("🎉 Complete Registration", type="primary"):
             # Save user data
-            save_user_to_json(
-                DATA_PATH,
+            USER_STORE.save_user(
                 username.lower(),
                 username,
                 st.session_state.registration_samples
             )
             
-            # Retrain model
-            user_data = load_users_from_json(DATA_PATH)
-            if len(user_data) >= 2:
-                metrics = st.session_state.authenticator.train(user_data)
-                st.session_state.authenticator.save()
-                st.success(f"Model trained with {metrics['cv_accuracy']:.1%} accuracy!")
+            # Enroll in the background; the current model keeps serving
+            training_service.request_retrain()
+            st.info("Your typing profile is being added to the model in the background.")
             
             st.session_state.registration_samples = []
             st.balloons()
@@ -633,15 +680,13 @@ def render_authenticate():
     if not st.session_state.authenticator.is_trained:
         st.warning("⚠️ Model not trained. Register at least 2 users first.")
         
-        # Try to load/train from existing data
-        if DATA_PATH.exists():
-            user_data = load_users_from_json(DATA_PATH)
-            if len(user_data) >= 2:
-                if st.button("Train Model"):
-                    metrics = st.session_state.authenticator.train(user_data)
-                    st.session_state.authenticator.save()
-                    st.success(f"Model trained! Accuracy: {metrics['cv_accuracy']:.1%}")
-                    st.rerun()
+        # Try to train from existing data
+        if len(USER_STORE.cached_users()) >= 2:
+            if training_service.is_busy:
+                st.info("⏳ Model training in progress...")
+            elif st.button("Train Model"):
+                training_service.request_retrain(debounce=0)
+                st.rerun()
         return
     
     # Show paragraph to type
@@ -736,11 +781,7 @@ def render_analytics():
     """Render the analytics page."""
     st.markdown("### 📊 Analytics Dashboard")
     
-    if not DATA_PATH.exists():
-        st.info("No user data available. Register some users first.")
-        return
-    
-    user_data = load_users_from_json(DATA_PATH)
+    user_data = USER_STORE.cached_users()
     
     if not user_data:
         st.info("No user data available.")
@@ -769,7 +810,7 @@ def render_analytics():
         for key in ['dwell_times', 'digraph_latencies', 'trigraph_latencies']:
             avg_features[key] = {}
             for sample in samples:
-                sample_dict = sample.to_dict()
+                sample_dict = sample.to_dict(skip_missing=True)
                 for k, v in sample_dict.get(key, {}).items():
                     if k not in avg_features[key]:
                         avg_features[key][k] = []
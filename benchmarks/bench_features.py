@@ -0,0 +1,60 @@
+"""
+Feature Extraction Benchmark
+
+Compares the per-event loop implementation of extract_features with the
+vectorized NumPy path on synthetic sessions of increasing length.
+
+Run with: python benchmarks/bench_features.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src import features
+from src.capture import KEY_VOCABULARY, KeystrokeSession
+from src.utils import SAMPLE_PARAGRAPHS
+
+
+def make_session(n_events: int, seed: int = 0) -> KeystrokeSession:
+    """Build a session typing the sample paragraphs with random timings."""
+    rng = np.random.default_rng(seed)
+    text = ' '.join(p['text'] for p in SAMPLE_PARAGRAPHS)
+    chars = [text[i % len(text)] for i in range(n_events)]
+    
+    codes = np.array([KEY_VOCABULARY.lookup(c) for c in chars], dtype=np.int32)
+    press = np.cumsum(rng.uniform(0.06, 0.25, n_events))
+    release = press + rng.uniform(0.04, 0.14, n_events)
+    
+    return KeystrokeSession.from_arrays(
+        codes, press, release, start_time=float(press[0]), end_time=float(release[-1])
+    )
+
+
+def best_of(func, number: int) -> float:
+    """Best per-call time in seconds over a few repeats."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main() -> None:
+    print(f"{'events':>8} {'loop (ms)':>12} {'vectorized (ms)':>16} {'speedup':>8}")
+    
+    for n_events in (100, 1_000, 100_000):
+        session = make_session(n_events)
+        number = max(1, 20_000 // n_events)
+        
+        # Force each path regardless of VECTORIZE_MIN_EVENTS
+        features.VECTORIZE_MIN_EVENTS = sys.maxsize
+        loop = best_of(lambda: features.extract_features(session), number)
+        features.VECTORIZE_MIN_EVENTS = 0
+        vectorized = best_of(lambda: features.extract_features(session), number)
+        
+        print(f"{n_events:>8} {loop * 1e3:>12.3f} {vectorized * 1e3:>16.3f} {loop / vectorized:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
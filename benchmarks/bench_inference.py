@@ -0,0 +1,69 @@
+"""
+Inference Latency Benchmark
+
+Compares scoring through sklearn (StandardScaler.transform followed by
+RandomForestClassifier.predict_proba) with the compiled NumPy forest,
+reporting p50/p99 single-sample latency and bulk throughput.
+
+Run with: python benchmarks/bench_inference.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.features import DEFAULT_LAYOUT, KeystrokeFeatures
+from src.model import KeystrokeAuthenticator
+
+
+def make_users(n_users: int, n_samples: int, seed: int = 0) -> dict[str, list[KeystrokeFeatures]]:
+    """Synthetic enrolment data with a distinct timing profile per user."""
+    rng = np.random.default_rng(seed)
+    users = {}
+    for i in range(n_users):
+        center = rng.uniform(0.05, 0.4, DEFAULT_LAYOUT.size)
+        users[f'user{i}'] = [
+            KeystrokeFeatures.from_vector(
+                rng.normal(center, 0.03).astype(np.float32), copy=False
+            )
+            for _ in range(n_samples)
+        ]
+    return users
+
+
+def latencies(func, samples: np.ndarray) -> np.ndarray:
+    """Per-call wall time in seconds for scoring each row on its own."""
+    times = np.empty(len(samples))
+    for i, row in enumerate(samples):
+        start = time.perf_counter()
+        func(row.reshape(1, -1))
+        times[i] = time.perf_counter() - start
+    return times
+
+
+def main() -> None:
+    authenticator = KeystrokeAuthenticator()
+    authenticator.train(make_users(10, 20))
+    
+    classifier, scaler, engine = authenticator.classifier, authenticator.scaler, authenticator.engine
+    sklearn_proba = lambda X: classifier.predict_proba(scaler.transform(X))
+    
+    X = np.random.default_rng(1).uniform(0.0, 0.45, (2_000, DEFAULT_LAYOUT.size)).astype(np.float32)
+    max_error = np.abs(sklearn_proba(X) - engine.predict_proba(X)).max()
+    print(f"max |probability difference|: {max_error:.2e}\n")
+    
+    print(f"{'path':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'2000 rows (ms)':>15}")
+    for name, func in (('sklearn', sklearn_proba), ('numpy', engine.predict_proba)):
+        single = latencies(func, X[:500]) * 1e3
+        start = time.perf_counter()
+        func(X)
+        bulk = (time.perf_counter() - start) * 1e3
+        print(f"{name:>8} {np.percentile(single, 50):>10.3f} {np.percentile(single, 99):>10.3f} {bulk:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
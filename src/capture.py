@@ -5,9 +5,28 @@ Handles real-time keystroke timing capture for biometric authentication.
 Captures key press/release events and calculates timing metrics.
 """
 
+import base64
+import math
+import threading
 import time
-from dataclasses import dataclass, field
-from typing import Optional
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .features import FeatureAccumulator
+
+
+# Initial number of rows reserved by a session's column arrays
+_INITIAL_CAPACITY = 256
+
+# Bits per key code when packing n-grams into integers
+KEY_CODE_BITS = 16
+MAX_KEY_CODES = 1 << KEY_CODE_BITS
+
+# Name browsers report for keys they cannot identify
+UNKNOWN_KEY = 'unidentified'
 
 
 @dataclass
@@ -25,7 +44,131 @@ class KeyEvent:
         return None
 
 
-@dataclass
+def normalize_key(key: str) -> str:
+    """Normalize key names for consistency."""
+    key = key.lower()
+    
+    # Handle special keys
+    if key in (' ', 'space', ' '):
+        return 'space'
+    if len(key) == 1 and key.isalpha():
+        return key
+    
+    return key
+
+
+def pack_codes(codes) -> int:
+    """Pack a sequence of key codes into one n-gram integer (first code highest)."""
+    packed = 0
+    for code in codes:
+        packed = (packed << KEY_CODE_BITS) | code
+    return packed
+
+
+class KeyVocabulary:
+    """
+    Maps normalized key names to small integer codes.
+    
+    Codes are assigned in first-seen order and never change, so they can be
+    stored in compact integer arrays and shared between sessions. Raw key
+    strings are cached after their first normalization, and n-grams are
+    packed into single integers of KEY_CODE_BITS per key.
+    
+    The vocabulary is capped at MAX_KEY_CODES entries; once full, unseen
+    keys share the code of UNKNOWN_KEY.
+    
+    It is shared by every session thread: lookups of known keys and cached
+    tables take no lock, while assigning a code or filling a cache is done
+    under one, so concurrent threads never hand out the same code twice.
+    """
+    
+    def __init__(self, keys: Optional[list[str]] = None):
+        self._lock = threading.RLock()
+        self._codes: dict[str, int] = {}
+        self._names: list[str] = []
+        self._raw_codes: dict[str, int] = {}
+        self._ngram_slots: dict[tuple[str, ...], dict[int, int]] = {}
+        self._ngram_tables: dict[tuple[str, ...], tuple[np.ndarray, np.ndarray]] = {}
+        for key in keys or []:
+            self.intern(key)
+    
+    def __len__(self) -> int:
+        return len(self._names)
+    
+    def intern(self, key: str) -> int:
+        """Return the code for a normalized key name, assigning one if new."""
+        code = self._codes.get(key)
+        if code is not None:
+            return code
+        
+        with self._lock:
+            code = self._codes.get(key)
+            if code is None:
+                # Keep the last code free for UNKNOWN_KEY
+                if len(self._names) >= MAX_KEY_CODES - 1 and key != UNKNOWN_KEY:
+                    return self.intern(UNKNOWN_KEY)
+                code = len(self._names)
+                # Name first, so a reader that finds the code can resolve it
+                self._names.append(key)
+                self._codes[key] = code
+        return code
+    
+    def lookup(self, raw_key: str) -> int:
+        """Return the code for a raw key string, normalizing it only once."""
+        code = self._raw_codes.get(raw_key)
+        if code is None:
+            code = self.intern(normalize_key(raw_key))
+            if len(self._raw_codes) < MAX_KEY_CODES:
+                self._raw_codes[raw_key] = code
+        return code
+    
+    def code(self, key: str) -> Optional[int]:
+        """Return the code for a key name, or None if it was never seen."""
+        return self._codes.get(key)
+    
+    def name(self, code: int) -> str:
+        """Return the key name for a code."""
+        return self._names[code]
+    
+    def pack(self, keys) -> int:
+        """Pack a sequence of key names (e.g. the letters of 'th') into an n-gram code."""
+        return pack_codes(self.intern(normalize_key(key)) for key in keys)
+    
+    def ngram_slots(self, ngrams: list[str]) -> dict[int, int]:
+        """
+        Precomputed lookup table from packed n-gram code to slot index.
+        
+        Tables are built once per n-gram list and cached.
+        """
+        key = tuple(ngrams)
+        slots = self._ngram_slots.get(key)
+        if slots is None:
+            with self._lock:
+                slots = self._ngram_slots.get(key)
+                if slots is None:
+                    slots = {self.pack(ngram): i for i, ngram in enumerate(ngrams)}
+                    self._ngram_slots[key] = slots
+        return slots
+    
+    def ngram_table(self, ngrams: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Sorted packed n-gram codes and their slot indices, for np.searchsorted.
+        
+        Array form of ngram_slots, built once per n-gram list and cached.
+        """
+        key = tuple(ngrams)
+        table = self._ngram_tables.get(key)
+        if table is None:
+            with self._lock:
+                table = self._ngram_tables.get(key)
+                if table is None:
+                    slots = self.ngram_slots(ngrams)
+                    packed = np.array(sorted(slots), dtype=np.uint64)
+                    table = (packed, np.array([slots[c] for c in packed.tolist()], dtype=np.intp))
+                    self._ngram_tables[key] = table
+        return table
+
+
 class KeystrokeSession:
     """
     Captures and stores keystroke timing data for a typing session.
@@ -35,54 +178,133 @@ class KeystrokeSession:
     - Flight time: Time between releasing one key and pressing the next
     - Digraph timing: Time for two-key sequences
     - Trigraph timing: Time for three-key sequences
+    
+    Completed keystrokes are stored column-wise in parallel typed arrays
+    (key code, press time, release time) that grow by doubling. The
+    ``key_codes``, ``press_times`` and ``release_times`` properties return
+    zero-copy views for feature extraction; iterating the session yields
+    ``KeyEvent`` objects for callers that want the row-oriented form.
+    
+    In streaming mode an accumulator is updated on every key release, and
+    with ``keep_events=False`` the columns are not filled at all, so memory
+    stays constant however long the session runs.
     """
     
-    events: list[KeyEvent] = field(default_factory=list)
-    _pending_events: dict[str, KeyEvent] = field(default_factory=dict)
-    start_time: Optional[float] = None
-    end_time: Optional[float] = None
+    def __init__(
+        self,
+        vocabulary: Optional[KeyVocabulary] = None,
+        accumulator: Optional['FeatureAccumulator'] = None,
+        keep_events: bool = True
+    ):
+        self.vocabulary = vocabulary or KEY_VOCABULARY
+        self.accumulator = accumulator
+        self.keep_events = keep_events
+        self._key_codes = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self._press_times = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._release_times = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._size = 0
+        self._n_completed = 0
+        self._pending_events: dict[int, float] = {}
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+    
+    def __len__(self) -> int:
+        return self._n_completed
+    
+    def __iter__(self) -> Iterator[KeyEvent]:
+        return self.iter_events()
     
     def on_key_down(self, key: str, timestamp: Optional[float] = None) -> None:
         """Record a key press event."""
-        ts = timestamp or time.time()
+        ts = time.time() if timestamp is None else timestamp
         
         if self.start_time is None:
             self.start_time = ts
             
         # Normalize key name
-        key = self._normalize_key(key)
+        code = self.vocabulary.lookup(key)
         
         # Only track if not already pressed (avoid key repeat)
-        if key not in self._pending_events:
-            self._pending_events[key] = KeyEvent(key=key, press_time=ts)
+        if code not in self._pending_events:
+            self._pending_events[code] = ts
     
     def on_key_up(self, key: str, timestamp: Optional[float] = None) -> None:
         """Record a key release event."""
-        ts = timestamp or time.time()
+        ts = time.time() if timestamp is None else timestamp
         self.end_time = ts
         
-        key = self._normalize_key(key)
+        code = self.vocabulary.lookup(key)
         
-        if key in self._pending_events:
-            event = self._pending_events.pop(key)
-            event.release_time = ts
-            self.events.append(event)
-    
-    def _normalize_key(self, key: str) -> str:
-        """Normalize key names for consistency."""
-        key = key.lower()
+        press_time = self._pending_events.pop(code, None)
+        if press_time is not None:
+            self._n_completed += 1
+            if self.accumulator is not None:
+                self.accumulator.add(code, press_time, ts)
+            if self.keep_events:
+                self._append(code, press_time, ts)
+    
+    def _append(self, code: int, press_time: float, release_time: float) -> None:
+        """Append a completed keystroke, growing the columns if full."""
+        if self._size == len(self._key_codes):
+            self._reserve(2 * self._size)
         
-        # Handle special keys
-        if key in (' ', 'space', ' '):
-            return 'space'
-        if len(key) == 1 and key.isalpha():
-            return key
+        i = self._size
+        self._key_codes[i] = code
+        self._press_times[i] = press_time
+        self._release_times[i] = release_time
+        self._size += 1
+    
+    def _reserve(self, capacity: int) -> None:
+        """Reallocate the column arrays to hold at least `capacity` rows."""
+        if capacity <= len(self._key_codes):
+            return
         
-        return key
+        for attr in ('_key_codes', '_press_times', '_release_times'):
+            old = getattr(self, attr)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, attr, new)
+    
+    _normalize_key = staticmethod(normalize_key)
+    
+    @property
+    def key_codes(self) -> np.ndarray:
+        """Key codes of completed keystrokes (view, invalidated on growth)."""
+        return self._key_codes[:self._size]
+    
+    @property
+    def press_times(self) -> np.ndarray:
+        """Press timestamps of completed keystrokes (view)."""
+        return self._press_times[:self._size]
+    
+    @property
+    def release_times(self) -> np.ndarray:
+        """Release timestamps of completed keystrokes (view)."""
+        return self._release_times[:self._size]
+    
+    @property
+    def dwell_times(self) -> np.ndarray:
+        """Dwell time of each completed keystroke."""
+        return self.release_times - self.press_times
+    
+    @property
+    def events(self) -> list[KeyEvent]:
+        """Completed keystrokes materialized as a list of KeyEvent objects."""
+        return list(self.iter_events())
+    
+    def iter_events(self) -> Iterator[KeyEvent]:
+        """Yield completed keystrokes as KeyEvent objects."""
+        name = self.vocabulary.name
+        for code, press, release in zip(
+            self.key_codes.tolist(),
+            self.press_times.tolist(),
+            self.release_times.tolist()
+        ):
+            yield KeyEvent(key=name(code), press_time=press, release_time=release)
     
     def get_completed_events(self) -> list[KeyEvent]:
         """Get all events where key was pressed and released."""
-        return [e for e in self.events if e.release_time is not None]
+        return self.events
     
     def get_typing_duration(self) -> Optional[float]:
         """Total time from first keypress to last key release."""
@@ -92,7 +314,7 @@ class KeystrokeSession:
     
     def get_characters_typed(self) -> int:
         """Number of characters typed in this session."""
-        return len(self.get_completed_events())
+        return self._n_completed
     
     def get_typing_speed(self) -> Optional[float]:
         """Average time per character (seconds/char)."""
@@ -104,10 +326,36 @@ class KeystrokeSession:
     
     def clear(self) -> None:
         """Reset the session for new input."""
-        self.events.clear()
+        self._size = 0
+        self._n_completed = 0
         self._pending_events.clear()
+        if self.accumulator is not None:
+            self.accumulator.reset()
         self.start_time = None
         self.end_time = None
+    
+    @classmethod
+    def from_arrays(
+        cls,
+        key_codes: np.ndarray,
+        press_times: np.ndarray,
+        release_times: np.ndarray,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        vocabulary: Optional[KeyVocabulary] = None
+    ) -> 'KeystrokeSession':
+        """Build a session from already paired keystroke columns."""
+        session = cls(vocabulary)
+        n = len(key_codes)
+        session._reserve(n)
+        session._key_codes[:n] = key_codes
+        session._press_times[:n] = press_times
+        session._release_times[:n] = release_times
+        session._size = n
+        session._n_completed = n
+        session.start_time = start_time
+        session.end_time = end_time
+        return session
 
 
 def parse_js_keystroke_data(js_data: list[dict]) -> KeystrokeSession:
@@ -136,8 +384,310 @@ def parse_js_keystroke_data(js_data: list[dict]) -> KeystrokeSession:
     return session
 
 
+# Event type codes used by the array-based parsers
+EVENT_KEYUP = 0
+EVENT_KEYDOWN = 1
+EVENT_OTHER = -1
+
+_EVENT_TYPES = {'keydown': EVENT_KEYDOWN, 'keyup': EVENT_KEYUP}
+
+
+def keystroke_data_to_arrays(
+    js_data: list[dict],
+    vocabulary: Optional[KeyVocabulary] = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert a JavaScript keystroke payload to parallel arrays in one pass.
+    
+    Args:
+        js_data: Event dicts in the format accepted by parse_js_keystroke_data
+        vocabulary: Key vocabulary used to intern key names
+        
+    Returns:
+        Tuple of (key codes, event types, timestamps in seconds)
+    """
+    vocabulary = vocabulary or KEY_VOCABULARY
+    n = len(js_data)
+    
+    # Normalize and intern each distinct key once, in first-seen order
+    keys = [event.get('key', '') for event in js_data]
+    codes_by_key = {key: vocabulary.lookup(key) for key in dict.fromkeys(keys)}
+    
+    key_codes = np.fromiter(map(codes_by_key.__getitem__, keys), dtype=np.int32, count=n)
+    event_types = np.fromiter(
+        (_EVENT_TYPES.get(event.get('type', ''), EVENT_OTHER) for event in js_data),
+        dtype=np.int8, count=n
+    )
+    timestamps = np.fromiter(
+        (event.get('time', 0) for event in js_data), dtype=np.float64, count=n
+    )
+    
+    timestamps /= 1000  # Convert ms to seconds
+    
+    return key_codes, event_types, timestamps
+
+
+def pair_key_events(
+    key_codes: np.ndarray,
+    event_types: np.ndarray,
+    timestamps: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pair keydown and keyup events using array operations.
+    
+    Mirrors KeystrokeSession.on_key_down/on_key_up: a key is pending after a
+    keydown and idle after a keyup, so repeated keydowns and unmatched keyups
+    are dropped. A keystroke completes on a keyup whose previous event for
+    the same key was a keydown, and its press time comes from the first
+    keydown of that run.
+    
+    Returns:
+        Tuple of (key codes, press times, release times) for completed
+        keystrokes, ordered by release event like the stateful parser
+    """
+    valid = np.flatnonzero(event_types != EVENT_OTHER)
+    
+    # Group events by key, keeping arrival order within each key
+    order = valid[np.argsort(key_codes[valid], kind='stable')]
+    codes = key_codes[order]
+    is_down = event_types[order] == EVENT_KEYDOWN
+    
+    same_key = np.zeros(len(order), dtype=bool)
+    same_key[1:] = codes[1:] == codes[:-1]
+    prev_down = np.zeros(len(order), dtype=bool)
+    prev_down[1:] = is_down[:-1]
+    prev_down &= same_key
+    
+    # First keydown of each run opens a keystroke; its position is carried
+    # forward so every closing keyup can find it
+    opens = is_down & ~prev_down
+    open_pos = np.maximum.accumulate(np.where(opens, np.arange(len(order)), 0))
+    
+    closes = np.flatnonzero(~is_down & prev_down)
+    press_idx = order[open_pos[closes - 1]]
+    release_idx = order[closes]
+    
+    # Restore completion order
+    completion = np.argsort(release_idx, kind='stable')
+    press_idx = press_idx[completion]
+    release_idx = release_idx[completion]
+    
+    return key_codes[release_idx], timestamps[press_idx], timestamps[release_idx]
+
+
+def parse_js_keystroke_data_bulk(
+    js_data: list[dict],
+    vocabulary: Optional[KeyVocabulary] = None
+) -> KeystrokeSession:
+    """
+    Parse keystroke data from JavaScript frontend using array operations.
+    
+    Produces the same session as parse_js_keystroke_data, but normalizes
+    each distinct key once and pairs events without per-event method calls.
+    """
+    key_codes, event_types, timestamps = keystroke_data_to_arrays(js_data, vocabulary)
+    return _session_from_event_arrays(key_codes, event_types, timestamps, vocabulary)
+
+
+def _session_from_event_arrays(
+    key_codes: np.ndarray,
+    event_types: np.ndarray,
+    timestamps: np.ndarray,
+    vocabulary: Optional[KeyVocabulary] = None
+) -> KeystrokeSession:
+    """Build a session from raw event arrays."""
+    downs = np.flatnonzero(event_types == EVENT_KEYDOWN)
+    ups = np.flatnonzero(event_types == EVENT_KEYUP)
+    start_time = float(timestamps[downs[0]]) if len(downs) else None
+    end_time = float(timestamps[ups[-1]]) if len(ups) else None
+    
+    codes, press_times, release_times = pair_key_events(
+        key_codes, event_types, timestamps
+    )
+    
+    return KeystrokeSession.from_arrays(
+        codes, press_times, release_times,
+        start_time=start_time,
+        end_time=end_time,
+        vocabulary=vocabulary
+    )
+
+
+# Packed wire format (see pack_keystroke_data)
+PACKED_FORMAT_VERSION = 1
+_MAX_VARINT_BYTES = 10
+
+
+def pack_keystroke_data(js_data: list[dict]) -> str:
+    """
+    Encode a JavaScript keystroke payload in the packed wire format.
+    
+    Python counterpart of the encoder in the capture JS. Layout (base64):
+    
+        version byte
+        varint K, then K x (varint byte length, UTF-8 key name)
+        varint N, then N x (varint key_index << 1 | is_keydown,
+                            zigzag varint time delta in microseconds)
+    
+    Key names are interned in a table in first-seen order and timestamps
+    are deltas from the previous event (the first from zero). Times are
+    rounded to microseconds half up, as Math.round does in the JS, so both
+    encoders produce the same bytes. Event types other than keydown/keyup
+    are dropped.
+    """
+    key_index: dict[str, int] = {}
+    body = bytearray()
+    n_events = 0
+    prev_us = 0
+    
+    for event in js_data:
+        event_type = _EVENT_TYPES.get(event.get('type', ''))
+        if event_type is None:
+            continue
+        
+        key = event.get('key', '')
+        index = key_index.setdefault(key, len(key_index))
+        time_us = _round_half_up(event.get('time', 0) * 1000)
+        delta = time_us - prev_us
+        prev_us = time_us
+        
+        _write_varint(body, (index << 1) | event_type)
+        _write_varint(body, 2 * delta if delta >= 0 else -2 * delta - 1)
+        n_events += 1
+    
+    out = bytearray([PACKED_FORMAT_VERSION])
+    _write_varint(out, len(key_index))
+    for key in key_index:
+        encoded = key.encode('utf-8')
+        _write_varint(out, len(encoded))
+        out += encoded
+    _write_varint(out, n_events)
+    out += body
+    
+    return base64.b64encode(bytes(out)).decode('ascii')
+
+
+def unpack_keystroke_data(
+    packed: str | bytes,
+    vocabulary: Optional[KeyVocabulary] = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode a packed keystroke payload straight into NumPy arrays.
+    
+    Only the small key table is parsed in Python; the event varints are
+    decoded with array operations.
+    
+    Args:
+        packed: Base64 string (or raw bytes) produced by the capture JS
+        vocabulary: Key vocabulary used to intern key names
+        
+    Returns:
+        Tuple of (key codes, event types, timestamps in seconds), the same
+        shape as keystroke_data_to_arrays
+    """
+    vocabulary = vocabulary or KEY_VOCABULARY
+    data = base64.b64decode(packed) if isinstance(packed, str) else bytes(packed)
+    
+    if not data or data[0] != PACKED_FORMAT_VERSION:
+        raise ValueError("Unsupported packed keystroke format")
+    
+    pos = 1
+    n_keys, pos = _read_varint(data, pos)
+    key_table = np.empty(n_keys, dtype=np.int32)
+    for i in range(n_keys):
+        length, pos = _read_varint(data, pos)
+        key = data[pos:pos + length].decode('utf-8')
+        pos += length
+        key_table[i] = vocabulary.lookup(key)
+    n_events, pos = _read_varint(data, pos)
+    
+    values = _decode_varints(np.frombuffer(data, dtype=np.uint8, offset=pos))
+    if len(values) != 2 * n_events:
+        raise ValueError("Truncated packed keystroke payload")
+    
+    pairs = values.reshape(n_events, 2)
+    key_index = pairs[:, 0] >> np.uint64(1)
+    if n_events and key_index.max() >= n_keys:
+        raise ValueError("Packed keystroke event references unknown key")
+    
+    zigzag = pairs[:, 1]
+    deltas = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+    
+    key_codes = key_table[key_index.astype(np.intp)]
+    event_types = (pairs[:, 0] & np.uint64(1)).astype(np.int8)
+    timestamps = np.cumsum(deltas) / 1e6  # Convert us to seconds
+    
+    return key_codes, event_types, timestamps
+
+
+def parse_packed_keystroke_data(
+    packed: str | bytes,
+    vocabulary: Optional[KeyVocabulary] = None
+) -> KeystrokeSession:
+    """Parse a packed keystroke payload into a session."""
+    key_codes, event_types, timestamps = unpack_keystroke_data(packed, vocabulary)
+    return _session_from_event_arrays(key_codes, event_types, timestamps, vocabulary)
+
+
+def _round_half_up(value: float) -> int:
+    """Round to the nearest integer with ties towards +infinity, like JS Math.round."""
+    result = math.floor(value)
+    # value - floor(value) is exact, unlike value + 0.5
+    if value - result >= 0.5:
+        result += 1
+    return result
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """Append an unsigned LEB128 varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """Read one unsigned varint, returning (value, next position)."""
+    value = shift = 0
+    while True:
+        if pos >= len(data) or shift >= 7 * _MAX_VARINT_BYTES:
+            raise ValueError("Malformed varint in packed keystroke payload")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _decode_varints(buf: np.ndarray) -> np.ndarray:
+    """Decode a run of back-to-back unsigned varints into a uint64 array."""
+    if len(buf) == 0:
+        return np.empty(0, dtype=np.uint64)
+    if buf[-1] >= 0x80:
+        raise ValueError("Malformed varint in packed keystroke payload")
+    
+    ends = np.flatnonzero(buf < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    
+    lengths = ends - starts + 1
+    if lengths.max() > _MAX_VARINT_BYTES:
+        raise ValueError("Malformed varint in packed keystroke payload")
+    
+    # Position of each byte within its varint gives its 7-bit shift
+    positions = np.arange(len(buf)) - np.repeat(starts, lengths)
+    chunks = (buf & 0x7F).astype(np.uint64) << (7 * positions).astype(np.uint64)
+    
+    return np.bitwise_or.reduceat(chunks, starts)
+
+
 # Constants for tracked keys
 TRACKED_LETTERS = ['e', 'a', 'r', 'i', 'o', 't', 'n', 's', 'h', 'l', 'd', 'g']
 TRACKED_DIGRAPHS = ['in', 'th', 'ti', 'on', 'an', 'he', 'al', 'er', 'es']
 TRACKED_TRIGRAPHS = ['the', 'and', 'are', 'ion', 'ing']
 
+
+# Shared key vocabulary; tracked keys are seeded first so their codes are stable
+KEY_VOCABULARY = KeyVocabulary(TRACKED_LETTERS + ['space'])
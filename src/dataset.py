@@ -0,0 +1,252 @@
+"""
+Streaming Dataset Module
+
+Reads users.json incrementally for datasets too large to load at once.
+iter_users_json() walks the file in fixed-size chunks with the standard
+library's JSON decoder and yields one user's samples at a time, so memory
+holds a single user record rather than the whole document;
+iter_user_records_json() also yields display names.
+build_training_matrix() scans that stream, filters users and packs their
+samples into a float32 matrix chunk by chunk, optionally straight into a
+memory-mapped .npy file.
+"""
+
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, TextIO
+
+import numpy as np
+
+from .features import DEFAULT_LAYOUT, KeystrokeFeatures
+from .featurestore import append_npy, write_npy
+
+
+# Characters read from users.json per chunk
+CHUNK_CHARS = 1 << 20
+
+# Rows packed in memory before they are appended to the output matrix
+CHUNK_ROWS = 4096
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _JsonStream:
+    """
+    Cursor over a JSON text read in chunks.
+    
+    Values are decoded with JSONDecoder.raw_decode; one that runs past the
+    buffered text is retried after reading more, with reads growing to the
+    size of the pending text so a large value costs linear time.
+    """
+    
+    def __init__(self, f: TextIO, chunk_size: int):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+    
+    def peek(self) -> str:
+        """Next non-whitespace character, or '' at the end of the text."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos:self._pos + 1]
+    
+    def expect(self, char: str) -> None:
+        """Consume char, which must be the next non-whitespace character."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in users file, found {found or 'end of file'!r}")
+        self._pos += 1
+    
+    def value(self):
+        """Decode the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+    
+    def _fill(self) -> bool:
+        """Read more text, dropping what was consumed; False at end of file."""
+        if self._eof:
+            return False
+        pending = self._buffer[self._pos:]
+        data = self._f.read(max(self._chunk_size, len(pending)))
+        if not data:
+            self._eof = True
+            return False
+        self._buffer = pending + data
+        self._pos = 0
+        return True
+
+
+def iter_users_json(
+    json_path: Path,
+    chunk_size: int = CHUNK_CHARS
+) -> Iterator[tuple[str, list[KeystrokeFeatures]]]:
+    """
+    Stream users out of a users.json file, one at a time.
+    
+    Users without samples are skipped, as in load_users_from_json.
+    
+    Args:
+        json_path: Path to users.json
+        chunk_size: Characters read per chunk
+    
+    Yields:
+        Tuples of (username, list of KeystrokeFeatures)
+    """
+    for username, _, samples in iter_user_records_json(json_path, chunk_size):
+        yield username, samples
+
+
+def iter_user_records_json(
+    json_path: Path,
+    chunk_size: int = CHUNK_CHARS
+) -> Iterator[tuple[str, str, list[KeystrokeFeatures]]]:
+    """
+    Stream users out of a users.json file along with their display names.
+    
+    Like iter_users_json, users without samples are skipped.
+    
+    Args:
+        json_path: Path to users.json
+        chunk_size: Characters read per chunk
+    
+    Yields:
+        Tuples of (username, display_name, list of KeystrokeFeatures), the
+        records SQLiteUserStore.save_users takes
+    """
+    with open(json_path, 'r') as f:
+        stream = _JsonStream(f, chunk_size)
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            
+            if key != 'users':
+                stream.value()
+            else:
+                stream.expect('{')
+                while stream.peek() != '}':
+                    username = stream.value()
+                    stream.expect(':')
+                    user_data = stream.value()
+                    samples = [
+                        KeystrokeFeatures.from_dict(sample.get('features', {}))
+                        for sample in user_data.get('samples', [])
+                    ]
+                    if samples:
+                        yield username, user_data.get('display_name', username), samples
+                    if stream.peek() != ',':
+                        break
+                    stream.expect(',')
+                stream.expect('}')
+            
+            if stream.peek() != ',':
+                break
+            stream.expect(',')
+        stream.expect('}')
+
+
+class _MatrixBuilder:
+    """
+    Packs feature vectors into CHUNK_ROWS-row float32 blocks.
+    
+    Full blocks are appended to an .npy file when one is given, else kept
+    as a list of blocks and concatenated once at the end.
+    """
+    
+    def __init__(self, n_features: int, chunk_rows: int, output_path: Optional[Path]):
+        self.output_path = output_path
+        self._block = np.empty((chunk_rows, n_features), dtype=np.float32)
+        self._filled = 0
+        self._blocks: list[np.ndarray] = []
+        self._n_rows = 0
+        
+        if output_path is not None:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            write_npy(output_path, np.empty((0, n_features), dtype=np.float32))
+    
+    def add(self, vector: np.ndarray) -> None:
+        self._block[self._filled] = vector
+        self._filled += 1
+        if self._filled == len(self._block):
+            self._flush()
+    
+    def finish(self) -> np.ndarray:
+        """The whole matrix; memory-mapped read-only when written to a file."""
+        self._flush()
+        if self.output_path is not None:
+            return np.load(self.output_path, mmap_mode='r')
+        if not self._blocks:
+            return self._block[:0].copy()
+        return np.concatenate(self._blocks)
+    
+    def _flush(self) -> None:
+        rows = self._block[:self._filled]
+        if self.output_path is not None:
+            append_npy(self.output_path, rows, self._n_rows)
+        else:
+            self._blocks.append(rows.copy())
+        self._n_rows += self._filled
+        self._filled = 0
+
+
+def build_training_matrix(
+    json_path: Path,
+    output_path: Optional[Path] = None,
+    users: Optional[Iterable[str]] = None,
+    min_samples: int = 1,
+    chunk_rows: int = CHUNK_ROWS
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Scan users.json into a training matrix in bounded memory.
+    
+    Only one user's samples and one block of rows are held at a time. With
+    output_path the matrix is written to that .npy file as it grows and
+    returned memory-mapped, so it may be larger than RAM; the result can
+    go straight to KeystrokeAuthenticator.train_matrix().
+    
+    Args:
+        json_path: Path to users.json
+        output_path: .npy file for the matrix; by default it is built in memory
+        users: Only include these users
+        min_samples: Skip users with fewer samples
+        chunk_rows: Rows packed per block
+    
+    Returns:
+        Tuple of the (n_samples, n_features) float32 matrix and the
+        username of each row, in file order
+    """
+    wanted = set(users) if users is not None else None
+    builder = _MatrixBuilder(DEFAULT_LAYOUT.size, chunk_rows, output_path)
+    
+    names: list[str] = []
+    counts: list[int] = []
+    for username, samples in iter_users_json(json_path):
+        if (wanted is not None and username not in wanted) or len(samples) < min_samples:
+            continue
+        for features in samples:
+            builder.add(features.to_vector())
+        names.append(username)
+        counts.append(len(samples))
+    
+    X = builder.finish()
+    y = np.repeat(np.array(names, dtype=str), counts)
+    return X, y
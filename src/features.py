@@ -5,20 +5,164 @@ Extracts keystroke dynamics features from typing sessions for ML classification.
 Features include dwell times, flight times, digraph/trigraph latencies.
 """
 
+import weakref
 import numpy as np
-from dataclasses import dataclass
+from collections import deque
+from collections.abc import MutableMapping
 from typing import Optional
 
+from scipy.sparse import csr_matrix, issparse
+
 from .capture import (
+    KEY_CODE_BITS,
+    KEY_VOCABULARY,
+    KeyVocabulary,
     KeystrokeSession, 
-    KeyEvent,
     TRACKED_LETTERS, 
     TRACKED_DIGRAPHS, 
     TRACKED_TRIGRAPHS
 )
+from .ngrams import NGramAutomaton, ngram_keys
+
+
+# Sessions with fewer completed keystrokes use the per-event loops, which
+# beat the fixed overhead of the NumPy path on small inputs
+VECTORIZE_MIN_EVENTS = 200
+
+# Longest n-gram whose packed key codes fit in a uint64
+_MAX_PACKED_LENGTH = 64 // KEY_CODE_BITS
+
+# Bump when the meaning of a feature value changes (units, definition), so
+# models persisted against the old schema are refused rather than misread
+FEATURE_SCHEMA_VERSION = 1
+
+
+class FeatureLayout:
+    """
+    Precomputed position of every feature in the feature vector.
+    
+    Built from a configurable vocabulary of dwell keys and n-grams of any
+    length (two or more keys). N-grams are grouped into digraph, trigraph
+    and longer "ngram" sections; each section maps to a slice of the vector
+    and every feature name to its offset, so vectors can be read and
+    written without rebuilding name lists.
+    
+    Order: dwell_times + digraph_latencies + trigraph_latencies
+           + ngram_latencies + typing_speed
+    """
+    
+    def __init__(
+        self,
+        dwell_keys: Optional[list[str]] = None,
+        ngrams: Optional[list[str]] = None
+    ):
+        if dwell_keys is None:
+            dwell_keys = TRACKED_LETTERS + ['space']
+        if ngrams is None:
+            ngrams = TRACKED_DIGRAPHS + TRACKED_TRIGRAPHS
+        
+        if len(set(dwell_keys)) != len(dwell_keys):
+            raise ValueError("Duplicate dwell keys in feature layout")
+        if len({ngram_keys(ngram) for ngram in ngrams}) != len(ngrams):
+            raise ValueError("Duplicate n-grams in feature layout")
+        if any(len(ngram) < 2 for ngram in ngrams):
+            raise ValueError("N-grams must span at least two keys")
+        
+        sections = (
+            ('dwell_times', 'dwell', list(dwell_keys)),
+            ('digraph_latencies', 'digraph', [g for g in ngrams if len(g) == 2]),
+            ('trigraph_latencies', 'trigraph', [g for g in ngrams if len(g) == 3]),
+            ('ngram_latencies', 'ngram', [g for g in ngrams if len(g) > 3]),
+        )
+        
+        self.sections: dict[str, tuple[slice, dict[str, int]]] = {}
+        names = []
+        offset = 0
+        
+        for section, prefix, keys in sections:
+            if section == 'ngram_latencies' and not keys:
+                continue
+            index = {key: i for i, key in enumerate(keys)}
+            self.sections[section] = (slice(offset, offset + len(keys)), index)
+            names.extend(f'{prefix}_{key}' for key in keys)
+            offset += len(keys)
+        
+        names.append('typing_speed')
+        self.typing_speed_offset = offset
+        self.size = offset + 1
+        self.names: tuple[str, ...] = tuple(names)
+        self.offsets: dict[str, int] = {name: i for i, name in enumerate(names)}
+        
+        # N-grams in vector order, occupying one contiguous region
+        self.dwell_keys: list[str] = sections[0][2]
+        self.ngrams: list[str] = [g for _, _, keys in sections[1:] for g in keys]
+        self.ngram_region = slice(len(self.dwell_keys), self.typing_speed_offset)
+        self.ngram_lengths = np.array([len(g) for g in self.ngrams], dtype=np.intp)
+        self.max_ngram_length = int(self.ngram_lengths.max()) if self.ngrams else 0
+        
+        # (length, indices into ngrams, n-grams) for each distinct length
+        self.ngram_groups: list[tuple[int, np.ndarray, list[str]]] = []
+        for n in np.unique(self.ngram_lengths).tolist():
+            indices = np.flatnonzero(self.ngram_lengths == n)
+            self.ngram_groups.append((n, indices, [self.ngrams[i] for i in indices]))
+        
+        self._automata: 'weakref.WeakKeyDictionary[KeyVocabulary, NGramAutomaton]' = (
+            weakref.WeakKeyDictionary()
+        )
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def automaton(self, vocabulary: KeyVocabulary) -> NGramAutomaton:
+        """Aho-Corasick automaton for this layout's n-grams (cached per vocabulary)."""
+        automaton = self._automata.get(vocabulary)
+        if automaton is None:
+            automaton = NGramAutomaton(self.ngrams, vocabulary)
+            self._automata[vocabulary] = automaton
+        return automaton
+
+
+DEFAULT_LAYOUT = FeatureLayout()
+
+
+class FeatureView(MutableMapping):
+    """
+    Dict-style view of one section of a feature buffer.
+    
+    Reads and writes go straight to the underlying float32 buffer; keys are
+    the section's tracked names and a value of 0.0 means missing. The keys
+    are fixed, so they cannot be deleted.
+    """
+    
+    __slots__ = ('_values', '_index')
+    
+    def __init__(self, values: np.ndarray, index: dict[str, int]):
+        self._values = values
+        self._index = index
+    
+    def __getitem__(self, key: str) -> float:
+        return float(self._values[self._index[key]])
+    
+    def __setitem__(self, key: str, value: float) -> None:
+        self._values[self._index[key]] = value
+    
+    def __delitem__(self, key: str) -> None:
+        if key not in self._index:
+            raise KeyError(key)
+        raise TypeError(
+            f"Cannot delete {key!r}: keys are fixed by the layout; set it to 0.0 to mark it missing"
+        )
+    
+    def __iter__(self):
+        return iter(self._index)
+    
+    def __len__(self) -> int:
+        return len(self._index)
+    
+    def __repr__(self) -> str:
+        return repr(dict(self))
 
 
-@dataclass
 class KeystrokeFeatures:
     """
     Extracted features from a typing session.
@@ -27,214 +171,657 @@ class KeystrokeFeatures:
     - Dwell times: How long each key is held (key-specific)
     - Digraph latencies: Time for common two-letter sequences
     - Trigraph latencies: Time for common three-letter sequences  
+    - N-gram latencies: Longer sequences, if the layout tracks any
     - Typing speed: Overall characters per second
+    
+    Values live in one contiguous float32 buffer ordered by a FeatureLayout.
+    The dict-style attributes are views into that buffer and to_vector()
+    returns it without copying. Keys outside the layout are not stored.
+    Being float32, values keep about seven significant digits; more precise
+    inputs, such as float64 samples in users.json, are rounded on the way in.
     """
     
-    dwell_times: dict[str, float]
-    digraph_latencies: dict[str, float]
-    trigraph_latencies: dict[str, float]
-    typing_speed: float
+    __slots__ = ('_buffer', 'layout')
     
-    def to_vector(self) -> np.ndarray:
-        """
-        Convert features to a fixed-length numpy array for ML models.
-        
-        Order: dwell_times (13) + digraph_latencies (9) + trigraph_latencies (5) + typing_speed (1) = 28
-        """
-        vector = []
+    def __init__(
+        self,
+        dwell_times: Optional[dict[str, float]] = None,
+        digraph_latencies: Optional[dict[str, float]] = None,
+        trigraph_latencies: Optional[dict[str, float]] = None,
+        typing_speed: float = 0.0,
+        layout: FeatureLayout = DEFAULT_LAYOUT,
+        ngram_latencies: Optional[dict[str, float]] = None
+    ):
+        self.layout = layout
+        self._buffer = np.zeros(layout.size, dtype=np.float32)
         
-        # Dwell times for tracked letters + space
-        for letter in TRACKED_LETTERS + ['space']:
-            vector.append(self.dwell_times.get(letter, 0.0))
+        for section, values in (
+            ('dwell_times', dwell_times),
+            ('digraph_latencies', digraph_latencies),
+            ('trigraph_latencies', trigraph_latencies),
+            ('ngram_latencies', ngram_latencies),
+        ):
+            if values and section in layout.sections:
+                self._fill_section(section, values)
         
-        # Digraph latencies
-        for digraph in TRACKED_DIGRAPHS:
-            vector.append(self.digraph_latencies.get(digraph, 0.0))
-        
-        # Trigraph latencies
-        for trigraph in TRACKED_TRIGRAPHS:
-            vector.append(self.trigraph_latencies.get(trigraph, 0.0))
+        self._buffer[layout.typing_speed_offset] = typing_speed
+    
+    def _fill_section(self, section: str, values: dict[str, float]) -> None:
+        """Copy tracked entries of a dict into a section of the buffer."""
+        region, index = self.layout.sections[section]
+        view = self._buffer[region]
+        for key, value in values.items():
+            i = index.get(key)
+            if i is not None:
+                view[i] = value
+    
+    def _view(self, section: str) -> FeatureView:
+        if section not in self.layout.sections:
+            return FeatureView(self._buffer[:0], {})
+        region, index = self.layout.sections[section]
+        return FeatureView(self._buffer[region], index)
+    
+    @property
+    def dwell_times(self) -> FeatureView:
+        """Average dwell time per tracked key."""
+        return self._view('dwell_times')
+    
+    @property
+    def digraph_latencies(self) -> FeatureView:
+        """Average latency per tracked digraph."""
+        return self._view('digraph_latencies')
+    
+    @property
+    def trigraph_latencies(self) -> FeatureView:
+        """Average latency per tracked trigraph."""
+        return self._view('trigraph_latencies')
+    
+    @property
+    def ngram_latencies(self) -> FeatureView:
+        """Average latency per tracked n-gram of four or more keys."""
+        return self._view('ngram_latencies')
+    
+    @property
+    def typing_speed(self) -> float:
+        """Average time per character (seconds/char)."""
+        return float(self._buffer[self.layout.typing_speed_offset])
+    
+    @typing_speed.setter
+    def typing_speed(self, value: float) -> None:
+        self._buffer[self.layout.typing_speed_offset] = value
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, KeystrokeFeatures):
+            return NotImplemented
+        return self.layout is other.layout and np.array_equal(self._buffer, other._buffer)
+    
+    def __repr__(self) -> str:
+        sections = ', '.join(
+            f'{section}={self._view(section)!r}' for section in self.layout.sections
+        )
+        return f'KeystrokeFeatures({sections}, typing_speed={self.typing_speed!r})'
+    
+    def to_vector(self) -> np.ndarray:
+        """
+        Return the features as a fixed-length numpy array for ML models.
         
-        # Typing speed
-        vector.append(self.typing_speed)
+        The array is the backing buffer itself (no copy); writing to it
+        changes these features.
         
-        return np.array(vector, dtype=np.float32)
+        Order (DEFAULT_LAYOUT): dwell_times (13) + digraph_latencies (9) + trigraph_latencies (5) + typing_speed (1) = 28
+        """
+        return self._buffer
     
     @classmethod
-    def from_vector(cls, vector: np.ndarray) -> 'KeystrokeFeatures':
-        """Reconstruct features from a vector."""
-        idx = 0
-        
-        dwell_times = {}
-        for letter in TRACKED_LETTERS + ['space']:
-            dwell_times[letter] = float(vector[idx])
-            idx += 1
-        
-        digraph_latencies = {}
-        for digraph in TRACKED_DIGRAPHS:
-            digraph_latencies[digraph] = float(vector[idx])
-            idx += 1
-        
-        trigraph_latencies = {}
-        for trigraph in TRACKED_TRIGRAPHS:
-            trigraph_latencies[trigraph] = float(vector[idx])
-            idx += 1
+    def from_vector(
+        cls,
+        vector: np.ndarray,
+        layout: FeatureLayout = DEFAULT_LAYOUT,
+        copy: bool = True
+    ) -> 'KeystrokeFeatures':
+        """
+        Reconstruct features from a vector.
         
-        typing_speed = float(vector[idx])
+        With copy=False a float32 vector is adopted as the buffer directly.
+        """
+        if len(vector) != layout.size:
+            raise ValueError(f"Expected vector of length {layout.size}, got {len(vector)}")
         
-        return cls(
-            dwell_times=dwell_times,
-            digraph_latencies=digraph_latencies,
-            trigraph_latencies=trigraph_latencies,
-            typing_speed=typing_speed
+        features = cls.__new__(cls)
+        features.layout = layout
+        features._buffer = (
+            np.array(vector, dtype=np.float32) if copy
+            else np.asarray(vector, dtype=np.float32)
         )
+        return features
     
-    def to_dict(self) -> dict:
-        """Convert to dictionary for JSON serialization."""
-        return {
-            'dwell_times': self.dwell_times,
-            'digraph_latencies': self.digraph_latencies,
-            'trigraph_latencies': self.trigraph_latencies,
-            'typing_speed': self.typing_speed
-        }
+    def to_dict(self, skip_missing: bool = False) -> dict:
+        """
+        Convert to dictionary for JSON serialization.
+        
+        Values are the shortest decimals that read back as the same float32,
+        so from_dict(to_dict()) restores these features exactly, though not
+        any extra precision the original inputs had.
+        
+        With skip_missing=True, features equal to 0.0 are left out, which
+        keeps samples of large n-gram layouts proportional to what was seen.
+        """
+        data = {}
+        for section, (region, index) in self.layout.sections.items():
+            values = dict(zip(index, _json_floats(self._buffer[region])))
+            if skip_missing:
+                values = {key: value for key, value in values.items() if value != 0.0}
+            data[section] = values
+        data['typing_speed'] = _json_floats(self._buffer[self.layout.typing_speed_offset:][:1])[0]
+        return data
     
     @classmethod
-    def from_dict(cls, data: dict) -> 'KeystrokeFeatures':
+    def from_dict(
+        cls,
+        data: dict,
+        layout: FeatureLayout = DEFAULT_LAYOUT
+    ) -> 'KeystrokeFeatures':
         """Create from dictionary."""
         return cls(
             dwell_times=data.get('dwell_times', {}),
             digraph_latencies=data.get('digraph_latencies', {}),
             trigraph_latencies=data.get('trigraph_latencies', {}),
-            typing_speed=data.get('typing_speed', 0.0)
+            typing_speed=data.get('typing_speed', 0.0),
+            layout=layout,
+            ngram_latencies=data.get('ngram_latencies', {})
         )
 
 
-def get_feature_names() -> list[str]:
-    """Get ordered list of feature names matching vector order."""
-    names = []
+def _json_floats(values: np.ndarray) -> list[float]:
+    """
+    Convert float32 values to Python floats using their shortest repr.
     
-    for letter in TRACKED_LETTERS + ['space']:
-        names.append(f'dwell_{letter}')
+    Keeps stored JSON as e.g. 0.087 rather than 0.08699999749660492.
+    """
+    return [float(str(v)) for v in values]
+
+
+def stack_features(
+    feature_list: list[KeystrokeFeatures],
+    sparse: bool = False
+) -> 'np.ndarray | csr_matrix':
+    """
+    Stack feature samples into an (n_samples, n_features) float32 matrix.
     
-    for digraph in TRACKED_DIGRAPHS:
-        names.append(f'digraph_{digraph}')
+    With sparse=True a CSR matrix of the non-zero (observed) features is
+    returned instead.
+    """
+    if not feature_list:
+        raise ValueError("Cannot stack empty feature list")
     
-    for trigraph in TRACKED_TRIGRAPHS:
-        names.append(f'trigraph_{trigraph}')
+    layout = feature_list[0].layout
+    if any(f.layout is not layout for f in feature_list):
+        raise ValueError("All samples must share one feature layout")
     
-    names.append('typing_speed')
+    if not sparse:
+        return np.stack([f.to_vector() for f in feature_list])
     
-    return names
+    indices, data, indptr = [], [], [0]
+    for features in feature_list:
+        vector = features.to_vector()
+        cols = np.flatnonzero(vector)
+        indices.append(cols)
+        data.append(vector[cols])
+        indptr.append(indptr[-1] + len(cols))
+    
+    return csr_matrix(
+        (np.concatenate(data), np.concatenate(indices), np.array(indptr)),
+        shape=(len(feature_list), layout.size),
+        dtype=np.float32
+    )
+
+
+def get_feature_names(layout: FeatureLayout = DEFAULT_LAYOUT) -> list[str]:
+    """Get ordered list of feature names matching vector order."""
+    return list(layout.names)
 
 
-def extract_features(session: KeystrokeSession) -> Optional[KeystrokeFeatures]:
+def extract_features(
+    session: KeystrokeSession,
+    layout: FeatureLayout = DEFAULT_LAYOUT
+) -> Optional[KeystrokeFeatures]:
     """
     Extract keystroke dynamics features from a typing session.
     
     Args:
         session: Completed keystroke capture session
+        layout: Tracked keys and n-grams defining the feature vector
         
     Returns:
         KeystrokeFeatures object or None if insufficient data
     """
-    events = session.get_completed_events()
+    if session.accumulator is not None and session.accumulator.layout is not layout:
+        raise ValueError("Streaming session was accumulated with a different layout")
     
-    if len(events) < 10:  # Need minimum data
+    if len(session) < 10:  # Need minimum data
         return None
     
-    # Calculate dwell times (average per key)
-    dwell_times = _calculate_dwell_times(events)
+    # Streaming sessions already hold running sums
+    if session.accumulator is not None:
+        return session.accumulator.to_features(session.get_typing_speed() or 0.0)
     
-    # Calculate digraph latencies
-    digraph_latencies = _calculate_digraph_latencies(events)
+    if len(session) >= VECTORIZE_MIN_EVENTS:
+        return _extract_features_vectorized(session, layout)
     
-    # Calculate trigraph latencies
-    trigraph_latencies = _calculate_trigraph_latencies(events)
+    codes = session.key_codes.tolist()
+    press_times = session.press_times.tolist()
+    release_times = session.release_times.tolist()
+    vocabulary = session.vocabulary
     
-    # Typing speed
-    typing_speed = session.get_typing_speed() or 0.0
+    vector = np.zeros(layout.size, dtype=np.float32)
+    
+    # Calculate dwell times (average per key)
+    dwell_times = _calculate_dwell_times(codes, press_times, release_times, vocabulary)
+    region, index = layout.sections['dwell_times']
+    vector[region] = [dwell_times.get(key, 0.0) for key in index]
     
-    return KeystrokeFeatures(
-        dwell_times=dwell_times,
-        digraph_latencies=digraph_latencies,
-        trigraph_latencies=trigraph_latencies,
-        typing_speed=typing_speed
+    # Calculate n-gram latencies
+    vector[layout.ngram_region] = _calculate_ngram_latencies(
+        codes, press_times, release_times, layout.automaton(vocabulary)
     )
+    
+    # Typing speed
+    vector[layout.typing_speed_offset] = session.get_typing_speed() or 0.0
+    
+    return KeystrokeFeatures.from_vector(vector, layout, copy=False)
+
+
+def _extract_features_vectorized(
+    session: KeystrokeSession,
+    layout: FeatureLayout
+) -> KeystrokeFeatures:
+    """
+    NumPy implementation of extract_features over the session's columns.
+    
+    Per-key dwell means use np.bincount weighted by dwell time; n-gram
+    latencies compare shifted arrays of packed codes against the tracked
+    tables and average per slot the same way (see extract_features_batch).
+    """
+    vector = np.zeros(layout.size, dtype=np.float32)
+    for _, cols, values in _columnar_feature_entries(
+        [session], np.zeros(1, dtype=np.intp), session.vocabulary, layout
+    ):
+        vector[cols] = values
+    return KeystrokeFeatures.from_vector(vector, layout, copy=False)
+
+
+def _match_ngrams(
+    codes: np.ndarray,
+    vocabulary: KeyVocabulary,
+    ngrams: list[str],
+    n: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find occurrences of n-grams of length `n` in a uint64 code array.
+    
+    Returns:
+        Tuple of (start positions, slot indices into `ngrams`)
+    """
+    windows = len(codes) - n + 1
+    if windows <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    
+    # Packed code of the n-gram starting at each position
+    shift = np.uint64(KEY_CODE_BITS)
+    packed = codes[:windows].copy()
+    for offset in range(1, n):
+        packed <<= shift
+        packed |= codes[offset:offset + windows]
+    
+    table_codes, table_slots = vocabulary.ngram_table(ngrams)
+    idx = np.minimum(np.searchsorted(table_codes, packed), len(table_codes) - 1)
+    starts = np.flatnonzero(table_codes[idx] == packed)
+    
+    return starts, table_slots[idx[starts]]
+
+
+def _match_layout_ngrams(
+    codes: np.ndarray,
+    vocabulary: KeyVocabulary,
+    layout: FeatureLayout
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find occurrences of every n-gram in the layout.
+    
+    N-grams short enough to pack into a uint64 are matched with one
+    shifted-array pass per distinct length; vocabularies with longer
+    n-grams are matched in a single automaton pass instead.
+    
+    Returns:
+        Tuple of (start positions, indices into layout.ngrams)
+    """
+    if layout.max_ngram_length > _MAX_PACKED_LENGTH:
+        ends, matched = layout.automaton(vocabulary).scan(codes)
+        return ends - layout.ngram_lengths[matched] + 1, matched
+    
+    wide_codes = codes.astype(np.uint64)
+    starts, matched = [], []
+    for n, indices, ngrams in layout.ngram_groups:
+        ngram_starts, slots = _match_ngrams(wide_codes, vocabulary, ngrams, n)
+        starts.append(ngram_starts)
+        matched.append(indices[slots])
+    
+    if not starts:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(starts), np.concatenate(matched)
+
+
+def extract_features_batch(
+    sessions: list[KeystrokeSession],
+    layout: FeatureLayout = DEFAULT_LAYOUT,
+    sparse: bool = False
+) -> tuple['np.ndarray | csr_matrix', np.ndarray]:
+    """
+    Extract feature vectors for many sessions straight into one matrix.
+    
+    Equivalent to stacking extract_features(s).to_vector() for each session,
+    but all sessions are concatenated and reduced with a single set of
+    bincount calls, without building KeystrokeFeatures objects.
+    
+    Args:
+        sessions: Keystroke sessions sharing one key vocabulary
+        layout: Tracked keys and n-grams defining the feature vector
+        sparse: Return a CSR matrix holding only the features actually
+            observed; memory then scales with matches, not layout size
+        
+    Returns:
+        Tuple of (float32 matrix of shape (n_sessions, layout.size), boolean
+        mask of rows with enough data; invalid rows are all zero)
+    """
+    shape = (len(sessions), layout.size)
+    valid = np.array([len(s) >= 10 for s in sessions], dtype=bool)
+    rows, cols, values = _extract_feature_entries(sessions, valid, layout)
+    
+    if sparse:
+        matrix = csr_matrix((values, (rows, cols)), shape=shape, dtype=np.float32)
+        matrix.eliminate_zeros()
+    else:
+        matrix = np.zeros(shape, dtype=np.float32)
+        matrix[rows, cols] = values
+    
+    return matrix, valid
+
+
+def _extract_feature_entries(
+    sessions: list[KeystrokeSession],
+    valid: np.ndarray,
+    layout: FeatureLayout
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the observed features of valid sessions in coordinate form.
+    
+    Returns:
+        Tuple of (row indices, column indices, values)
+    """
+    entries: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0))
+    
+    if not valid.any():
+        return empty
+    
+    vocabulary = sessions[0].vocabulary
+    if any(s.vocabulary is not vocabulary for s in sessions):
+        raise ValueError("All sessions must share one key vocabulary")
+    
+    # Streaming sessions without stored columns report their accumulators
+    rows = []
+    for row in np.flatnonzero(valid).tolist():
+        session = sessions[row]
+        if len(session.key_codes) == len(session):
+            rows.append(row)
+        else:
+            if session.accumulator.layout is not layout:
+                raise ValueError("Streaming session was accumulated with a different layout")
+            typing_speed = session.get_typing_speed() or 0.0
+            vector = session.accumulator.to_features(typing_speed).to_vector()
+            cols = np.flatnonzero(vector)
+            entries.append((np.full(len(cols), row), cols, vector[cols]))
+    batch = [sessions[row] for row in rows]
+    
+    if batch:
+        entries.extend(_columnar_feature_entries(batch, np.array(rows), vocabulary, layout))
+    
+    if not entries:
+        return empty
+    return tuple(np.concatenate(parts) for parts in zip(*entries))
+
 
+def _columnar_feature_entries(
+    batch: list[KeystrokeSession],
+    rows: np.ndarray,
+    vocabulary: KeyVocabulary,
+    layout: FeatureLayout
+) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Feature entries of sessions with stored columns, as (rows, cols, values) parts."""
+    n_rows = len(batch)
+    lengths = np.array([len(s) for s in batch])
+    bounds = np.cumsum(lengths)[:-1]
+    segment = np.repeat(np.arange(n_rows), lengths) if n_rows > 1 else None
+    codes = np.concatenate([s.key_codes for s in batch])
+    press_times = np.concatenate([s.press_times for s in batch])
+    release_times = np.concatenate([s.release_times for s in batch])
+    
+    entries = []
+    
+    # Dwell times: map codes to tracked dwell slots (-1 for untracked keys)
+    # and average every (session, slot) pair, so the tables scale with the
+    # tracked keys rather than the vocabulary
+    region, index = layout.sections['dwell_times']
+    tracked = np.array([vocabulary.intern(key) for key in index], dtype=np.intp)
+    n_tracked = len(tracked)
+    slot_of = np.full(len(vocabulary), -1, dtype=np.intp)
+    slot_of[tracked] = np.arange(n_tracked)
+    slots = slot_of[codes]
+    is_tracked = slots >= 0
+    
+    groups = slots[is_tracked]
+    if segment is not None:
+        groups = segment[is_tracked] * n_tracked + groups
+    counts = np.bincount(groups, minlength=n_rows * n_tracked).reshape(n_rows, n_tracked)
+    sums = np.bincount(
+        groups,
+        weights=(release_times - press_times)[is_tracked],
+        minlength=n_rows * n_tracked
+    ).reshape(n_rows, n_tracked)
+    seg, col = np.nonzero(counts)
+    entries.append((
+        rows[seg],
+        region.start + col,
+        sums[seg, col] / counts[seg, col]
+    ))
+    
+    # N-gram latencies, ignoring windows that span two sessions
+    n_ngrams = len(layout.ngrams)
+    starts, matched = _match_layout_ngrams(codes, vocabulary, layout)
+    ends = starts + layout.ngram_lengths[matched] - 1
+    keep = release_times[ends] != 0
+    if len(bounds):
+        keep &= np.searchsorted(bounds, starts, side='right') == np.searchsorted(bounds, ends, side='right')
+    starts, ends, matched = starts[keep], ends[keep], matched[keep]
+    
+    groups = matched if segment is None else segment[starts] * n_ngrams + matched
+    observed, means = _grouped_means(groups, release_times[ends] - press_times[starts])
+    entries.append((
+        rows[observed // n_ngrams] if n_ngrams else observed,
+        layout.ngram_region.start + (observed % n_ngrams if n_ngrams else observed),
+        means
+    ))
+    
+    entries.append((
+        rows,
+        np.full(n_rows, layout.typing_speed_offset),
+        np.array([s.get_typing_speed() or 0.0 for s in batch])
+    ))
+    
+    return entries
 
-def _calculate_dwell_times(events: list[KeyEvent]) -> dict[str, float]:
+
+def _grouped_means(groups: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Mean of `values` per distinct group index.
+    
+    Returns:
+        Tuple of (sorted distinct groups, mean per group)
+    """
+    observed, inverse = np.unique(groups, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(observed))
+    sums = np.bincount(inverse, weights=values, minlength=len(observed))
+    return observed, sums / np.maximum(counts, 1)
+
+
+def _calculate_dwell_times(
+    codes: list[int],
+    press_times: list[float],
+    release_times: list[float],
+    vocabulary: KeyVocabulary
+) -> dict[str, float]:
     """Calculate average dwell time for each key."""
-    key_dwells: dict[str, list[float]] = {}
+    key_dwells: dict[int, list[float]] = {}
     
-    for event in events:
-        if event.dwell_time is not None:
-            key = event.key
-            if key not in key_dwells:
-                key_dwells[key] = []
-            key_dwells[key].append(event.dwell_time)
+    for code, press, release in zip(codes, press_times, release_times):
+        if code not in key_dwells:
+            key_dwells[code] = []
+        key_dwells[code].append(release - press)
     
     # Calculate averages
     return {
-        key: np.mean(dwells) 
-        for key, dwells in key_dwells.items()
+        vocabulary.name(code): sum(dwells) / len(dwells)
+        for code, dwells in key_dwells.items()
         if len(dwells) > 0
     }
 
 
-def _calculate_digraph_latencies(events: list[KeyEvent]) -> dict[str, float]:
+def _calculate_ngram_latencies(
+    codes: list[int],
+    press_times: list[float],
+    release_times: list[float],
+    automaton: NGramAutomaton
+) -> list[float]:
     """
-    Calculate digraph (two-key sequence) latencies.
+    Calculate average latency of each n-gram in one automaton pass.
     
-    Latency = time from pressing first key to releasing second key.
+    Latency = time from pressing the first key to releasing the last key.
+    
+    Returns:
+        Mean latency per n-gram in the automaton's order, 0.0 if unseen
     """
-    digraph_times: dict[str, list[float]] = {}
+    lengths = automaton.lengths.tolist()
+    sums = [0.0] * len(lengths)
+    counts = [0] * len(lengths)
     
-    for i in range(len(events) - 1):
-        first, second = events[i], events[i + 1]
-        
-        if first.key and second.key and second.release_time:
-            digraph = first.key + second.key
-            
-            if digraph in TRACKED_DIGRAPHS:
-                latency = second.release_time - first.press_time
-                
-                if digraph not in digraph_times:
-                    digraph_times[digraph] = []
-                digraph_times[digraph].append(latency)
+    ends, matched = automaton.scan(codes)
+    for end, index in zip(ends.tolist(), matched.tolist()):
+        release = release_times[end]
+        if release:
+            sums[index] += release - press_times[end - lengths[index] + 1]
+            counts[index] += 1
     
-    return {
-        digraph: np.mean(times)
-        for digraph, times in digraph_times.items()
-        if len(times) > 0
-    }
+    return [
+        total / count if count else 0.0
+        for total, count in zip(sums, counts)
+    ]
 
 
-def _calculate_trigraph_latencies(events: list[KeyEvent]) -> dict[str, float]:
+class FeatureAccumulator:
     """
-    Calculate trigraph (three-key sequence) latencies.
+    Running sums and counts for dwell times and n-gram latencies.
     
-    Latency = time from pressing first key to releasing third key.
+    Updated once per completed keystroke by a streaming KeystrokeSession,
+    so producing features at the end costs O(number of features) rather
+    than a rescan of the events. N-grams are matched by stepping the
+    layout's Aho-Corasick automaton, and state is bounded by the tracked
+    dwell keys and n-grams, independent of session length and of how far
+    the shared key vocabulary has grown.
     """
-    trigraph_times: dict[str, list[float]] = {}
     
-    for i in range(len(events) - 2):
-        first, second, third = events[i], events[i + 1], events[i + 2]
+    def __init__(
+        self,
+        vocabulary: Optional[KeyVocabulary] = None,
+        layout: FeatureLayout = DEFAULT_LAYOUT
+    ):
+        self.vocabulary = vocabulary or KEY_VOCABULARY
+        self.layout = layout
+        self._automaton = layout.automaton(self.vocabulary)
+        self._lengths = layout.ngram_lengths.tolist()
         
-        if first.key and second.key and third.key and third.release_time:
-            trigraph = first.key + second.key + third.key
-            
-            if trigraph in TRACKED_TRIGRAPHS:
-                latency = third.release_time - first.press_time
-                
-                if trigraph not in trigraph_times:
-                    trigraph_times[trigraph] = []
-                trigraph_times[trigraph].append(latency)
+        # Key code -> dwell slot for the layout's tracked keys
+        _, index = layout.sections['dwell_times']
+        self._dwell_slots = {self.vocabulary.intern(key): i for key, i in index.items()}
+        self.reset()
     
-    return {
-        trigraph: np.mean(times)
-        for trigraph, times in trigraph_times.items()
-        if len(times) > 0
-    }
+    def reset(self) -> None:
+        """Clear all running sums."""
+        self._dwell_sums = [0.0] * len(self._dwell_slots)
+        self._dwell_counts = [0] * len(self._dwell_slots)
+        self._ngram_sums = [0.0] * len(self._lengths)
+        self._ngram_counts = [0] * len(self._lengths)
+        
+        # Automaton state and press times of the last max_ngram_length keystrokes
+        self._state = 0
+        self._recent_presses: deque[float] = deque(maxlen=max(self.layout.max_ngram_length, 1))
+    
+    def add(self, code: int, press_time: float, release_time: float) -> None:
+        """Fold one completed keystroke into the running sums."""
+        slot = self._dwell_slots.get(code)
+        if slot is not None:
+            self._dwell_sums[slot] += release_time - press_time
+            self._dwell_counts[slot] += 1
+        
+        self._recent_presses.append(press_time)
+        self._state, matched = self._automaton.step(self._state, code)
+        if matched and release_time:
+            for index in matched:
+                first_press = self._recent_presses[-self._lengths[index]]
+                self._ngram_sums[index] += release_time - first_press
+                self._ngram_counts[index] += 1
+    
+    def to_features(self, typing_speed: float = 0.0) -> KeystrokeFeatures:
+        """Build a KeystrokeFeatures from the current running means."""
+        layout = self.layout
+        vector = np.zeros(layout.size, dtype=np.float32)
+        
+        region, _ = layout.sections['dwell_times']
+        vector[region] = [
+            total / count if count else 0.0
+            for total, count in zip(self._dwell_sums, self._dwell_counts)
+        ]
+        
+        vector[layout.ngram_region] = [
+            total / count if count else 0.0
+            for total, count in zip(self._ngram_sums, self._ngram_counts)
+        ]
+        vector[layout.typing_speed_offset] = typing_speed
+        
+        return KeystrokeFeatures.from_vector(vector, layout, copy=False)
+
+
+def create_streaming_session(
+    vocabulary: Optional[KeyVocabulary] = None,
+    keep_events: bool = False,
+    layout: FeatureLayout = DEFAULT_LAYOUT
+) -> KeystrokeSession:
+    """
+    Create a session that updates feature accumulators on every key release.
+    
+    Args:
+        vocabulary: Key vocabulary shared by the session and accumulator
+        keep_events: Also store keystrokes in the session's columns
+        layout: Tracked keys and n-grams to accumulate
+        
+    Returns:
+        KeystrokeSession whose features are available in O(features)
+    """
+    vocabulary = vocabulary or KEY_VOCABULARY
+    return KeystrokeSession(
+        vocabulary=vocabulary,
+        accumulator=FeatureAccumulator(vocabulary, layout),
+        keep_events=keep_events
+    )
 
 
 def aggregate_features(feature_list: list[KeystrokeFeatures]) -> KeystrokeFeatures:
@@ -253,12 +840,137 @@ def aggregate_features(feature_list: list[KeystrokeFeatures]) -> KeystrokeFeatur
     if len(feature_list) == 1:
         return feature_list[0]
     
-    # Stack all vectors
-    vectors = np.stack([f.to_vector() for f in feature_list])
-    
-    # Calculate mean (ignoring zeros as missing values)
-    masked = np.ma.masked_equal(vectors, 0)
-    mean_vector = np.ma.filled(masked.mean(axis=0), 0)
+    # Mean ignoring zeros as missing values
+    profile = RunningProfile(feature_list[0].layout)
+    for features in feature_list:
+        profile.update(features)
     
-    return KeystrokeFeatures.from_vector(mean_vector)
+    return profile.to_features()
 
+
+class RunningProfile:
+    """
+    Online per-feature statistics for a user's samples.
+    
+    Keeps count, mean and M2 (sum of squared deviations) for each feature
+    using Welford updates, treating 0.0 as missing like aggregate_features.
+    Adding a sample is O(features), two profiles can be merged (e.g. from
+    parallel workers), and the whole profile serializes to 3 x 28 floats.
+    """
+    
+    __slots__ = ('layout', 'count', 'mean', 'm2')
+    
+    def __init__(self, layout: FeatureLayout = DEFAULT_LAYOUT):
+        self.layout = layout
+        self.count = np.zeros(layout.size, dtype=np.float64)
+        self.mean = np.zeros(layout.size, dtype=np.float64)
+        self.m2 = np.zeros(layout.size, dtype=np.float64)
+    
+    @property
+    def n_samples(self) -> int:
+        """Largest number of observations of any feature."""
+        return int(self.count.max()) if len(self.count) else 0
+    
+    def update(self, sample: 'KeystrokeFeatures | np.ndarray') -> None:
+        """Fold one sample into the profile."""
+        x = sample.to_vector() if isinstance(sample, KeystrokeFeatures) else sample
+        x = np.asarray(x, dtype=np.float64)
+        present = x != 0
+        
+        self.count += present
+        delta = np.where(present, x - self.mean, 0.0)
+        self.mean += np.divide(delta, self.count, out=np.zeros_like(delta), where=present)
+        self.m2 += delta * np.where(present, x - self.mean, 0.0)
+    
+    def merge(self, other: 'RunningProfile') -> 'RunningProfile':
+        """
+        Combine another profile into this one (Chan et al. parallel update).
+        
+        Returns:
+            self, so partial profiles can be folded with functools.reduce
+        """
+        if other.layout is not self.layout:
+            raise ValueError("Cannot merge profiles with different feature layouts")
+        
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        weight = np.divide(other.count, total, out=np.zeros_like(total), where=total > 0)
+        
+        self.mean += delta * weight
+        self.m2 += other.m2 + delta * delta * self.count * weight
+        self.count = total
+        return self
+    
+    @classmethod
+    def from_vectors(
+        cls,
+        vectors: np.ndarray,
+        layout: FeatureLayout = DEFAULT_LAYOUT
+    ) -> 'RunningProfile':
+        """
+        Build a profile from a (n_samples, n_features) matrix in one pass.
+        
+        Sparse matrices are reduced over their stored entries only.
+        """
+        profile = cls(layout)
+        
+        if issparse(vectors):
+            vectors = csr_matrix(vectors, dtype=np.float64)
+            vectors.eliminate_zeros()
+            profile.count = vectors.getnnz(axis=0).astype(np.float64)
+            sums = np.asarray(vectors.sum(axis=0)).ravel()
+            profile.mean = np.divide(
+                sums, profile.count, out=np.zeros_like(sums), where=profile.count > 0
+            )
+            deviations = vectors.data - profile.mean[vectors.indices]
+            profile.m2 = np.bincount(
+                vectors.indices, weights=deviations ** 2, minlength=layout.size
+            )
+            return profile
+        
+        vectors = np.asarray(vectors, dtype=np.float64)
+        present = vectors != 0
+        
+        profile.count = present.sum(axis=0).astype(np.float64)
+        sums = vectors.sum(axis=0)
+        profile.mean = np.divide(
+            sums, profile.count, out=np.zeros_like(sums), where=profile.count > 0
+        )
+        profile.m2 = (np.where(present, vectors - profile.mean, 0.0) ** 2).sum(axis=0)
+        return profile
+    
+    def variance(self, ddof: int = 1) -> np.ndarray:
+        """Per-feature variance (0.0 where fewer than ddof + 1 observations)."""
+        denom = self.count - ddof
+        return np.divide(self.m2, denom, out=np.zeros_like(self.m2), where=denom > 0)
+    
+    def std(self, ddof: int = 1) -> np.ndarray:
+        """Per-feature standard deviation."""
+        return np.sqrt(self.variance(ddof))
+    
+    def to_features(self) -> KeystrokeFeatures:
+        """Averaged features (0.0 where a feature was never observed)."""
+        return KeystrokeFeatures.from_vector(self.mean, self.layout)
+    
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            'count': self.count.tolist(),
+            'mean': self.mean.tolist(),
+            'm2': self.m2.tolist()
+        }
+    
+    @classmethod
+    def from_dict(
+        cls,
+        data: dict,
+        layout: FeatureLayout = DEFAULT_LAYOUT
+    ) -> 'RunningProfile':
+        """Create from dictionary."""
+        profile = cls(layout)
+        for name in ('count', 'mean', 'm2'):
+            values = np.asarray(data[name], dtype=np.float64)
+            if values.shape != (layout.size,):
+                raise ValueError(f"Profile field '{name}' does not match the feature layout")
+            setattr(profile, name, values)
+        return profile
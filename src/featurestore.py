@@ -0,0 +1,381 @@
+"""
+Feature Store Module
+
+Binary copy of a users.json file's feature samples for fast reads. Next to
+data/users.json it keeps users.features.npy, an (n_rows, n_features)
+float32 matrix, users.user_ids.npy, the owning user id of each row, and
+users.table.json, the user table plus the size and mtime of the users.json
+it mirrors. Readers memory-map the arrays, so training, analytics and
+neighbour lookups get feature matrices without parsing JSON, and processes
+share the pages.
+
+Updates are incremental: a re-registered user's new rows are appended in
+place and the table records the row they start at, which retires the old
+ones. Once superseded rows outnumber live ones the arrays are rewritten
+without them.
+"""
+
+import io
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+from .features import DEFAULT_LAYOUT, FEATURE_SCHEMA_VERSION, KeystrokeFeatures
+
+
+MATRIX_SUFFIX = '.features.npy'
+USER_IDS_SUFFIX = '.user_ids.npy'
+TABLE_SUFFIX = '.table.json'
+
+# User id reported for rows superseded by a later registration
+DEAD = -1
+
+# Times a read is retried when a write swaps files underneath it, and the
+# seconds waited before the first retry (doubling after each) so the
+# writer can finish
+_READ_ATTEMPTS = 5
+_RETRY_DELAY = 0.005
+
+# Header readers and writers by .npy format version
+_HEADER_IO = {
+    (1, 0): (npy_format.read_array_header_1_0, npy_format.write_array_header_1_0),
+    (2, 0): (npy_format.read_array_header_2_0, npy_format.write_array_header_2_0)
+}
+
+
+def source_signature(path: Path) -> Optional[list[int]]:
+    """[mtime_ns, size] of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def write_npy(path: Path, array: np.ndarray) -> None:
+    """Save an array to an .npy file atomically."""
+    os.replace(_stage_npy(path, array), path)
+
+
+def _stage_npy(path: Path, array: np.ndarray) -> Path:
+    """Save an array to a temporary file next to path, to be renamed over it."""
+    temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(temp_path, 'wb') as f:
+        np.save(f, array)
+    return temp_path
+
+
+def append_npy(path: Path, rows: np.ndarray, start: int) -> None:
+    """
+    Write rows into an .npy file from row start on, dropping any rows after.
+    
+    The data is written first and the header's shape updated in place
+    afterwards; numpy leaves room in the header for the first axis to
+    grow. If the new header does not fit, the file is rewritten instead.
+    """
+    with open(path, 'r+b') as f:
+        version = npy_format.read_magic(f)
+        read_header, write_header = _HEADER_IO[version]
+        shape, fortran_order, dtype = read_header(f)
+        data_offset = f.tell()
+        
+        header = io.BytesIO()
+        write_header(header, {
+            'descr': npy_format.dtype_to_descr(dtype),
+            'fortran_order': fortran_order,
+            'shape': (start + len(rows), *shape[1:])
+        })
+        
+        if header.tell() == data_offset:
+            row_bytes = dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64))
+            f.seek(data_offset + start * row_bytes)
+            f.write(np.ascontiguousarray(rows, dtype=dtype).tobytes())
+            f.truncate()
+            f.seek(0)
+            f.write(header.getvalue())
+            return
+    
+    existing = np.load(path)[:start]
+    write_npy(path, np.concatenate([existing, rows.astype(dtype, copy=False)]))
+
+
+class FeatureStore:
+    """
+    Memory-mapped feature matrix mirroring one users.json file.
+    
+    The store is current when its table records the users.json signature
+    on disk; save_user_to_json updates it after each write, and
+    open_feature_store() in the model module rebuilds it when it is not.
+    
+    Only one process may write at a time, as with users.json itself. An
+    update writes its rows in place past those the table covers and then
+    renames a new table over the old one, so readers in any process see
+    a user's old samples or new ones, never neither. A compaction, or an
+    append that outgrows the .npy header, replaces array files before the
+    table; the table records their inodes, and readers that load files
+    the table does not describe retry.
+    """
+    
+    def __init__(self, source: Path):
+        self.source = Path(source)
+        stem = self.source.with_suffix('')
+        self.matrix_path = stem.with_name(stem.name + MATRIX_SUFFIX)
+        self.user_ids_path = stem.with_name(stem.name + USER_IDS_SUFFIX)
+        self.table_path = stem.with_name(stem.name + TABLE_SUFFIX)
+    
+    @property
+    def table(self) -> dict:
+        """
+        User table: users (index = user id), the first row of each user's
+        current samples (starts), n_rows, n_dead, source signature.
+        
+        Read from disk on every access; it is small next to the arrays, and
+        no stat signature reliably tells apart two writes in quick
+        succession, e.g. through another FeatureStore instance or process.
+        """
+        return self._read_table()
+    
+    @property
+    def users(self) -> list[str]:
+        """Usernames in order of first registration, indexed by user id."""
+        return self.table['users']
+    
+    def is_current(self) -> bool:
+        """Whether the store mirrors users.json as it is on disk now."""
+        return bool(self.table) and self._matches(source_signature(self.source))
+    
+    def arrays(self, mmap: bool = True) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Every stored row, including superseded ones.
+        
+        Args:
+            mmap: Memory-map the arrays read-only instead of reading them
+        
+        Returns:
+            Tuple of the (n_rows, n_features) float32 matrix and the int32
+            user id of each row (DEAD for superseded rows)
+        """
+        _, X, user_ids = self._snapshot(mmap)
+        return X, user_ids
+    
+    def _snapshot(self, mmap: bool = True) -> tuple[dict, np.ndarray, np.ndarray]:
+        """
+        The table with the arrays it describes, so callers see one consistent view.
+        
+        Arrays are accepted only if the files kept the inodes the table
+        records while they were loaded; otherwise a compaction (or an
+        append that had to rewrite a file) swapped them and the read is
+        retried with the new table.
+        """
+        mode = 'r' if mmap else None
+        for attempt in range(_READ_ATTEMPTS):
+            if attempt:
+                time.sleep(_RETRY_DELAY * 2 ** (attempt - 1))
+            table = self.table
+            files = self._file_ids()
+            try:
+                X = np.load(self.matrix_path, mmap_mode=mode)
+                user_ids = np.load(self.user_ids_path, mmap_mode=mode)
+            except (FileNotFoundError, ValueError):
+                # np.load reads the header and maps the data through separate
+                # opens, which a swap in between leaves inconsistent
+                continue
+            if table.get('files') == files == self._file_ids():
+                break
+        else:
+            raise RuntimeError(f"Feature store for {self.source} kept changing while being read")
+        
+        n_rows = table['n_rows']
+        return table, X[:n_rows], _retire_superseded(user_ids[:n_rows], table['starts'])
+    
+    def user_matrix(self, username: str) -> np.ndarray:
+        """(n_samples, n_features) matrix of one user's samples."""
+        table, X, user_ids = self._snapshot()
+        try:
+            user_id = table['users'].index(username)
+        except ValueError:
+            return np.empty((0, X.shape[1]), dtype=np.float32)
+        return X[user_ids == user_id]
+    
+    def training_data(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Live rows as (X, y), grouped by username in sorted order.
+        
+        Row order matches what KeystrokeAuthenticator.train builds from
+        the equivalent dict, so training on either gives the same model.
+        """
+        table, X, user_ids = self._snapshot()
+        users = np.array(table['users'], dtype=str)
+        
+        rank = np.empty(len(users), dtype=np.int32)
+        rank[np.argsort(users, kind='stable')] = np.arange(len(users), dtype=np.int32)
+        live = np.flatnonzero(user_ids != DEAD)
+        order = live[np.argsort(rank[user_ids[live]], kind='stable')]
+        
+        return X[order], users[user_ids[order]]
+    
+    def load_users(self) -> dict[str, list[KeystrokeFeatures]]:
+        """The users.json data as load_users_from_json returns it."""
+        table, X, user_ids = self._snapshot()
+        users = table['users']
+        live = user_ids != DEAD
+        order = np.argsort(user_ids[live], kind='stable')
+        rows, owners = X[live][order], user_ids[live][order]
+        bounds = np.flatnonzero(np.diff(owners)) + 1
+        
+        user_features = {}
+        for block, owner_rows in zip(np.split(rows, bounds), np.split(owners, bounds)):
+            if len(block):
+                user_features[users[owner_rows[0]]] = [
+                    KeystrokeFeatures.from_vector(row, copy=False) for row in block
+                ]
+        # Keep the users.json order, i.e. that of first registration
+        return {user: user_features[user] for user in users if user in user_features}
+    
+    def rebuild(self, user_features: dict[str, list[KeystrokeFeatures]]) -> None:
+        """Rewrite the whole store from users.json's data."""
+        users = [user for user, samples in user_features.items() if samples]
+        counts = [len(user_features[user]) for user in users]
+        vectors = [f.to_vector() for user in users for f in user_features[user]]
+        X = (
+            np.stack(vectors).astype(np.float32, copy=False) if vectors
+            else np.empty((0, DEFAULT_LAYOUT.size), dtype=np.float32)
+        )
+        user_ids = np.repeat(np.arange(len(users), dtype=np.int32), counts).astype(np.int32)
+        starts = np.concatenate([[0], np.cumsum(counts[:-1], dtype=np.int64)]) if users else []
+        
+        write_npy(self.matrix_path, X)
+        write_npy(self.user_ids_path, user_ids)
+        self._write_table(users, [int(start) for start in starts], len(X), 0)
+    
+    def update_user(
+        self,
+        username: str,
+        features_list: list[KeystrokeFeatures],
+        previous: Optional[list[int]]
+    ) -> bool:
+        """
+        Replace one user's samples after users.json was rewritten.
+        
+        Args:
+            username: User whose samples were saved
+            features_list: The user's new samples
+            previous: users.json signature before the write
+        
+        Returns:
+            False, leaving the store untouched, if it did not mirror the
+            previous users.json; the caller should rebuild()
+        """
+        if not self._matches(previous):
+            return False
+        
+        table = self.table
+        if not self.matrix_path.exists():
+            self.rebuild({})
+            table = self.table
+        
+        users, starts = list(table['users']), list(table['starts'])
+        n_rows, n_dead = table['n_rows'], table['n_dead']
+        if username in users:
+            user_id = users.index(username)
+            # Rows of the registration being replaced; older ones are
+            # already counted
+            user_ids = np.load(self.user_ids_path, mmap_mode='r')[starts[user_id]:n_rows]
+            n_dead += int(np.count_nonzero(user_ids == user_id))
+            del user_ids
+        else:
+            user_id = len(users)
+            users.append(username)
+            starts.append(n_rows)
+        
+        # Rows past n_rows are invisible until the table below says otherwise
+        if features_list:
+            X = np.stack([f.to_vector() for f in features_list]).astype(np.float32, copy=False)
+            append_npy(self.matrix_path, X, n_rows)
+            append_npy(self.user_ids_path, np.full(len(X), user_id, dtype=np.int32), n_rows)
+        starts[user_id] = n_rows
+        n_rows += len(features_list)
+        
+        if n_dead > n_rows - n_dead:
+            self._compact(users, starts, n_rows)
+        else:
+            self._write_table(users, starts, n_rows, n_dead)
+        return True
+    
+    def _compact(self, users: list[str], starts: list[int], n_rows: int) -> None:
+        """Rewrite the arrays without superseded rows."""
+        X = np.load(self.matrix_path)[:n_rows]
+        user_ids = _retire_superseded(np.load(self.user_ids_path)[:n_rows], starts)
+        live = user_ids != DEAD
+        X, user_ids = X[live], user_ids[live]
+        
+        # Each user's live rows stay contiguous; a user with none starts at the end
+        compact_starts = np.full(len(users), len(user_ids), dtype=np.int64)
+        owners, first = np.unique(user_ids, return_index=True)
+        compact_starts[owners] = first
+        
+        # Swap both files in only once both are written, keeping the window
+        # in which they disagree with the table short
+        staged = [_stage_npy(self.matrix_path, X), _stage_npy(self.user_ids_path, user_ids)]
+        os.replace(staged[0], self.matrix_path)
+        os.replace(staged[1], self.user_ids_path)
+        self._write_table(users, [int(start) for start in compact_starts], len(X), 0)
+    
+    def _matches(self, signature: Optional[list[int]]) -> bool:
+        """Whether the table exists, fits this schema and mirrors signature."""
+        table = self.table
+        if not table:
+            # No store yet mirrors a missing users.json
+            return signature is None
+        return (
+            table.get('schema') == FEATURE_SCHEMA_VERSION
+            and table.get('n_features') == DEFAULT_LAYOUT.size
+            and 'starts' in table
+            and table.get('source') == signature
+        )
+    
+    def _read_table(self) -> dict:
+        """Parsed table, or {} if there is none."""
+        try:
+            with open(self.table_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def _file_ids(self) -> Optional[list[int]]:
+        """Inodes of the matrix and user id files, or None if either is missing."""
+        try:
+            return [os.stat(self.matrix_path).st_ino, os.stat(self.user_ids_path).st_ino]
+        except FileNotFoundError:
+            return None
+    
+    def _write_table(self, users: list[str], starts: list[int], n_rows: int, n_dead: int) -> None:
+        """Atomically record the table along with the current users.json signature."""
+        table = {
+            'schema': FEATURE_SCHEMA_VERSION,
+            'n_features': DEFAULT_LAYOUT.size,
+            'source': source_signature(self.source),
+            'files': self._file_ids(),
+            'users': users,
+            'starts': starts,
+            'n_rows': n_rows,
+            'n_dead': n_dead
+        }
+        temp_path = self.table_path.with_name(f'.{self.table_path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(table, f)
+        os.replace(temp_path, self.table_path)
+
+
+def _retire_superseded(user_ids: np.ndarray, starts: list[int]) -> np.ndarray:
+    """User ids with rows before their user's current start replaced by DEAD."""
+    rows = np.arange(len(user_ids))
+    superseded = rows < np.asarray(starts, dtype=np.int64)[user_ids]
+    if not superseded.any():
+        return user_ids
+    return np.where(superseded, DEAD, user_ids).astype(np.int32)
@@ -0,0 +1,197 @@
+"""
+Forest Inference Module
+
+Pure NumPy scoring for trained random forests. A fitted
+RandomForestClassifier and its StandardScaler are flattened into packed
+node arrays, with the scaling folded into the split thresholds, so that
+samples can be scored without sklearn's per-call overhead (or sklearn
+being importable at all).
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+
+# Rows scored per traversal so the per-step index arrays stay cache-sized
+BLOCK_ROWS = 256
+
+
+class CompiledForest:
+    """
+    Random forest flattened into packed node arrays.
+    
+    All trees share one set of arrays; roots holds each tree's first node.
+    Leaves split on feature 0 at +inf and list themselves as both children,
+    so every sample can take exactly max_depth steps without branching.
+    """
+    
+    __slots__ = ('feature', 'threshold', 'children', 'value', 'roots', 'classes', 'max_depth')
+    
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: np.ndarray,
+        max_depth: int
+    ):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.children = np.asarray(children, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.classes = np.asarray(classes)
+        self.max_depth = int(max_depth)
+    
+    @property
+    def n_trees(self) -> int:
+        """Number of trees in the forest."""
+        return len(self.roots)
+    
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Find the leaf each sample reaches in every tree.
+        
+        Args:
+            X: (n_samples, n_features) unscaled feature matrix
+        
+        Returns:
+            (n_trees, n_samples) array of node indices
+        """
+        X = _as_matrix(X)
+        n_samples, n_features = X.shape
+        
+        # Tree-major flat layout: 1-D take() gathers are markedly faster
+        # than 2-D fancy indexing, and leaves come out grouped per tree
+        values = X.ravel().astype(np.float64)
+        row_offsets = np.tile(np.arange(n_samples, dtype=np.int32) * n_features, self.n_trees)
+        children = self.children.ravel()
+        nodes = np.repeat(self.roots, n_samples)
+        
+        for _ in range(self.max_depth):
+            go_right = values.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = children.take(2 * nodes + go_right)
+        
+        return nodes.reshape(self.n_trees, n_samples)
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities averaged over all trees.
+        
+        Trees are summed in order before dividing, as sklearn does, so the
+        result matches RandomForestClassifier.predict_proba.
+        
+        Args:
+            X: (n_samples, n_features) unscaled feature matrix
+        
+        Returns:
+            (n_samples, n_classes) probabilities, columns following classes
+        """
+        X = _as_matrix(X)
+        if len(X) <= BLOCK_ROWS:
+            return self.value.take(self.apply(X), axis=0).sum(axis=0) / self.n_trees
+        return np.concatenate([
+            self.predict_proba(X[start:start + BLOCK_ROWS])
+            for start in range(0, len(X), BLOCK_ROWS)
+        ])
+    
+    def save(self, path: Path) -> None:
+        """Save the packed arrays to an .npz file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            children=self.children,
+            value=self.value,
+            roots=self.roots,
+            classes=self.classes,
+            max_depth=self.max_depth
+        )
+    
+    @classmethod
+    def load(cls, path: Path) -> 'CompiledForest':
+        """Load a forest saved with save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in cls.__slots__})
+
+
+def compile_forest(classifier, scaler=None) -> CompiledForest:
+    """
+    Flatten a fitted RandomForestClassifier into a CompiledForest.
+    
+    The classifier is read through its fitted attributes only, so this
+    module never imports sklearn itself.
+    
+    Args:
+        classifier: Fitted single-output RandomForestClassifier
+        scaler: StandardScaler the classifier was trained behind, if any;
+            folded into the thresholds so raw features can be scored
+    
+    Returns:
+        CompiledForest scoring unscaled feature vectors
+    """
+    n_features = classifier.n_features_in_
+    n_classes = len(classifier.classes_)
+    
+    # x_scaled <= t  <=>  x <= t * scale + mean  (scale is always positive)
+    scale = np.ones(n_features)
+    mean = np.zeros(n_features)
+    if scaler is not None:
+        if getattr(scaler, 'scale_', None) is not None:
+            scale = np.asarray(scaler.scale_, dtype=np.float64)
+        if scaler.with_mean:
+            mean = np.asarray(scaler.mean_, dtype=np.float64)
+    
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    
+    for estimator in classifier.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        nodes = np.arange(n_nodes)
+        is_leaf = tree.children_left < 0
+        
+        feature = np.where(is_leaf, 0, tree.feature)
+        threshold = tree.threshold * scale[feature] + mean[feature]
+        threshold[is_leaf] = np.inf
+        
+        left = np.where(is_leaf, nodes, tree.children_left) + offset
+        right = np.where(is_leaf, nodes, tree.children_right) + offset
+        
+        # Leaf values are class counts (or weighted fractions); normalise
+        # each to the distribution the tree itself would predict
+        value = tree.value[:, 0, :n_classes].astype(np.float64)
+        totals = value.sum(axis=1, keepdims=True)
+        value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+        
+        features.append(feature)
+        thresholds.append(threshold)
+        children.append(np.column_stack([left, right]))
+        values.append(value)
+        roots.append(offset)
+        
+        offset += n_nodes
+        max_depth = max(max_depth, tree.max_depth)
+    
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        children=np.concatenate(children),
+        value=np.concatenate(values),
+        roots=np.array(roots),
+        classes=classifier.classes_,
+        max_depth=max_depth
+    )
+
+
+def _as_matrix(X) -> np.ndarray:
+    """Coerce one vector, a dense matrix or a sparse matrix to a 2-D array."""
+    if hasattr(X, 'toarray'):
+        X = X.toarray()
+    X = np.asarray(X, dtype=np.float32)
+    return X.reshape(1, -1) if X.ndim == 1 else X
@@ -0,0 +1,240 @@
+"""
+Journal Storage Module
+
+Append-only user store. Each registration appends a single 'user' record
+(creating or replacing that user, samples included) to a JSONL journal
+and fsyncs it, so a write costs O(its own samples) however large the
+dataset grows. A background compactor
+folds sealed journals into a snapshot in the users.json format; loading
+reads the snapshot and replays the journal tail.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .features import KeystrokeFeatures
+from .model import DATASET_CACHE, UserStore
+
+
+SNAPSHOT_NAME = 'snapshot.json'
+JOURNAL_NAME = 'journal.jsonl'
+SEALED_SUFFIX = '.sealed.jsonl'
+
+# Journal size that triggers a background compaction
+COMPACT_BYTES = 4 * 1024 * 1024
+
+# Times a read is retried when a compaction swaps files underneath it
+_READ_ATTEMPTS = 5
+
+
+class JournalUserStore(UserStore):
+    """
+    UserStore backed by a snapshot plus an append-only journal.
+    
+    Replaying is idempotent: a 'user' record replaces that user outright,
+    so a sealed journal replayed on top of a snapshot that already holds
+    it yields the same state. That makes every step of compaction
+    crash-safe, and since a registration is one line, a torn append is
+    dropped whole rather than half applied.
+    
+    Appends and journal sealing are serialized by a lock within this
+    process, and compaction runs on a background thread here too. Other
+    processes may read the store, retrying when a compaction swaps files
+    underneath them, but must not write to it: their appends would not
+    take that lock.
+    """
+    
+    def __init__(self, directory: Path, compact_bytes: int = COMPACT_BYTES):
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        directory.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+    
+    @property
+    def snapshot_path(self) -> Path:
+        return self.directory / SNAPSHOT_NAME
+    
+    @property
+    def journal_path(self) -> Path:
+        return self.directory / JOURNAL_NAME
+    
+    def user_exists(self, username: str) -> bool:
+        return bool(self._read_state().get(username, {}).get('samples'))
+    
+    def count_users(self) -> int:
+        return sum(1 for user_data in self._read_state().values() if user_data['samples'])
+    
+    def save_user(
+        self,
+        username: str,
+        display_name: str,
+        features_list: list[KeystrokeFeatures]
+    ) -> None:
+        """Append one record holding the user and their samples, then fsync the journal."""
+        record = {
+            'op': 'user',
+            'username': username,
+            'display_name': display_name,
+            'samples': [{'features': f.to_dict(skip_missing=True)} for f in features_list]
+        }
+        payload = json.dumps(record, separators=(',', ':')) + '\n'
+        
+        with self._lock:
+            with open(self.journal_path, 'ab') as f:
+                # Drop a line torn by an earlier crash, even one missing
+                # only its newline, so it is never applied after the fact
+                if f.tell():
+                    f.truncate(self._complete_length())
+                f.write(payload.encode())
+                f.flush()
+                os.fsync(f.fileno())
+            size = self.journal_path.stat().st_size
+        DATASET_CACHE.invalidate(self.journal_path)
+        
+        if size >= self.compact_bytes:
+            self.compact_in_background()
+    
+    def iter_samples(
+        self,
+        username: Optional[str] = None
+    ) -> Iterator[tuple[str, KeystrokeFeatures]]:
+        for user, user_data in self._read_state().items():
+            if username is None or user == username:
+                for sample in user_data['samples']:
+                    yield user, KeystrokeFeatures.from_dict(sample['features'])
+    
+    def watched_paths(self) -> list[Path]:
+        return [self.journal_path, self.snapshot_path]
+    
+    def compact(self) -> None:
+        """
+        Fold the journal into the snapshot.
+        
+        The active journal is sealed by renaming it (new writes start a
+        fresh one), the new snapshot is written to a temporary file and
+        renamed over the old one, and only then are sealed journals removed.
+        """
+        with self._compact_lock:
+            self._compact()
+    
+    def _compact(self) -> None:
+        """Body of compact(); callers hold the compaction lock."""
+        with self._lock:
+            if self.journal_path.exists() and self.journal_path.stat().st_size:
+                os.replace(
+                    self.journal_path,
+                    self.directory / f'{JOURNAL_NAME}.{time.time_ns()}{SEALED_SUFFIX}'
+                )
+        
+        sealed = self._sealed_journals()
+        if not sealed:
+            return
+        
+        users = self._load_snapshot()
+        for path in sealed:
+            self._replay(path, users)
+        
+        data = {'users': users, 'metadata': {'version': '2.0.0'}}
+        temp_path = self.directory / f'.{SNAPSHOT_NAME}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        
+        for path in sealed:
+            path.unlink()
+    
+    def compact_in_background(self) -> None:
+        """Start a compaction thread unless one is already running."""
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+    
+    def _complete_length(self) -> int:
+        """Length of the active journal up to and including its last newline."""
+        with open(self.journal_path, 'rb') as f:
+            end = f.seek(0, os.SEEK_END)
+            while end:
+                start = max(0, end - (1 << 16))
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline >= 0:
+                    return start + newline + 1
+                end = start
+        return 0
+    
+    def _sealed_journals(self) -> list[Path]:
+        """Sealed journals, oldest first."""
+        return sorted(self.directory.glob(f'{JOURNAL_NAME}.*{SEALED_SUFFIX}'))
+    
+    def _generation(self) -> tuple:
+        """Changes whenever a compaction seals a journal or drops one."""
+        try:
+            active = self.journal_path.stat().st_ino
+        except FileNotFoundError:
+            active = None
+        return tuple(p.name for p in self._sealed_journals()), active
+    
+    def _read_state(self) -> dict:
+        """
+        Current users: snapshot, then sealed journals, then the active journal.
+        
+        Retried if a compaction sealed or removed a journal mid-read.
+        """
+        for _ in range(_READ_ATTEMPTS):
+            generation = self._generation()
+            try:
+                users = self._load_snapshot()
+                for path in self._sealed_journals():
+                    self._replay(path, users)
+                self._replay(self.journal_path, users)
+            except FileNotFoundError:
+                continue
+            if self._generation() == generation:
+                return users
+        
+        raise RuntimeError(f"Journal in {self.directory} kept changing while being read")
+    
+    def _load_snapshot(self) -> dict:
+        """Users dict of the snapshot, in the users.json layout."""
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                return json.load(f).get('users', {})
+        except FileNotFoundError:
+            return {}
+    
+    @staticmethod
+    def _replay(path: Path, users: dict) -> None:
+        """Apply a journal's records to a users dict in place."""
+        if path.name == JOURNAL_NAME and not path.exists():
+            return
+        
+        with open(path, 'r') as f:
+            for line in f:
+                # A crash mid-append can leave a torn final line
+                if not line.endswith('\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn line terminated by an append from an older version
+                    continue
+                if record['op'] == 'user':
+                    users[record['username']] = {
+                        'display_name': record['display_name'],
+                        'samples': record.get('samples', [])
+                    }
+                elif record['op'] == 'sample':
+                    # Journals written before samples were folded into the
+                    # 'user' record
+                    users[record['username']]['samples'].append({'features': record['features']})
@@ -2,22 +2,58 @@
 ML Model Module
 
 Machine learning classifier for user identification based on keystroke dynamics.
-Uses Random Forest with confidence scoring for authentication decisions.
+Uses Random Forest with confidence scoring for authentication decisions, and
+per-user templates for 1:1 verification of a claimed identity. Enrollment
+data lives behind a pluggable UserStore (JSON file or indexed SQLite).
 """
 
 import json
 import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import closing
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional
 from dataclasses import dataclass
 
 import numpy as np
 import joblib
+from scipy.sparse import issparse
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import cross_val_score
 
-from .features import KeystrokeFeatures, get_feature_names
+from .features import (
+    DEFAULT_LAYOUT,
+    FeatureLayout,
+    KeystrokeFeatures,
+    RunningProfile,
+    get_feature_names,
+    stack_features
+)
+from .dataset import iter_user_records_json, iter_users_json
+from .featurestore import FeatureStore, source_signature
+from .forest import CompiledForest, compile_forest
+
+
+# Layouts at least this wide are trained on sparse matrices by default
+SPARSE_MIN_FEATURES = 256
+
+# Users enrolled incrementally before enroll() falls back to a full retrain
+CONSOLIDATE_EVERY = 5
+
+# Cap on other users' samples drawn per enrolled sample when fitting a verifier
+NEGATIVES_PER_POSITIVE = 20
+
+# Mean scaled deviation per feature above which a claimed identity is rejected
+VERIFY_THRESHOLD = 1.5
+
+# Floor on a template feature's spread, relative to its mean, so that a few
+# near-identical enrollment samples don't make small deviations look huge
+MIN_RELATIVE_SPREAD = 0.1
 
 
 @dataclass
@@ -32,18 +68,42 @@ class PredictionResult:
         return self.confidence >= threshold
 
 
+@dataclass
+class VerificationResult:
+    """Result of verifying a claimed identity against its template."""
+    claimed_user: str
+    accepted: bool
+    distance: float
+    n_features: int
+
+
 class KeystrokeAuthenticator:
     """
     ML-based keystroke dynamics authenticator.
     
     Uses Random Forest classifier to identify users based on their
     typing patterns. Supports training, prediction, and persistence.
+    
+    Users registered after the last full train() are enrolled with a small
+    one-vs-rest verifier forest each instead of refitting the main forest;
+    enroll() consolidates into a full retrain every consolidate_every users.
     """
     
-    def __init__(self, model_path: Optional[Path] = None):
+    def __init__(
+        self,
+        model_path: Optional[Path] = None,
+        consolidate_every: int = CONSOLIDATE_EVERY,
+        n_jobs: int = -1
+    ):
         self.classifier: Optional[RandomForestClassifier] = None
         self.scaler: Optional[StandardScaler] = None
+        self.engine: Optional[CompiledForest] = None
+        self.verifiers: dict[str, CompiledForest] = {}
         self.users: list[str] = []
+        self.feature_names: list[str] = get_feature_names()
+        self.consolidate_every = consolidate_every
+        self.n_jobs = n_jobs
+        self.sparse = False
         self.model_path = model_path or Path('models/keystroke_model.joblib')
         self._is_trained = False
     
@@ -55,37 +115,93 @@ class KeystrokeAuthenticator:
     def train(
         self, 
         user_features: dict[str, list[KeystrokeFeatures]],
-        n_estimators: int = 100
+        n_estimators: int = 100,
+        sparse: Optional[bool] = None,
+        cv: bool = True
     ) -> dict:
         """
         Train the classifier on user keystroke data.
         
+        Trees (and cross-validation folds) are fitted on n_jobs workers.
+        
         Args:
             user_features: Dict mapping username to list of feature samples
             n_estimators: Number of trees in Random Forest
+            sparse: Train on a CSR matrix of observed features; by default
+                chosen from the layout width (see SPARSE_MIN_FEATURES)
+            cv: Cross-validate for the reported accuracy; pass False to
+                skip it, or defer it with cross_validate()
             
         Returns:
-            Training metrics dict
+            Training metrics dict; 'timings' holds wall seconds per stage
         """
         if len(user_features) < 2:
             raise ValueError("Need at least 2 users to train classifier")
         
-        # Prepare training data
-        X, y = [], []
-        self.users = sorted(user_features.keys())
+        start = time.perf_counter()
         
-        for user in self.users:
-            samples = user_features[user]
-            for features in samples:
-                X.append(features.to_vector())
+        # Prepare training data
+        samples, y = [], []
+        for user in sorted(user_features.keys()):
+            for features in user_features[user]:
+                samples.append(features)
                 y.append(user)
         
-        X = np.array(X)
-        y = np.array(y)
+        layout = samples[0].layout
+        if sparse is None:
+            sparse = layout.size >= SPARSE_MIN_FEATURES
+        
+        X = stack_features(samples, sparse=sparse)
+        prepare = time.perf_counter() - start
         
-        # Scale features
-        self.scaler = StandardScaler()
+        metrics = self.train_matrix(X, np.array(y), n_estimators=n_estimators, layout=layout, cv=cv)
+        metrics['timings']['prepare'] += prepare
+        metrics['timings']['total'] += prepare
+        return metrics
+    
+    def train_matrix(
+        self,
+        X,
+        y: np.ndarray,
+        n_estimators: int = 100,
+        layout: FeatureLayout = DEFAULT_LAYOUT,
+        cv: bool = True
+    ) -> dict:
+        """
+        Train the classifier on a prepared feature matrix.
+        
+        Lets callers skip building KeystrokeFeatures, e.g. when X comes
+        memory-mapped from FeatureStore.training_data().
+        
+        Args:
+            X: (n_samples, n_features) matrix, dense or CSR
+            y: Username of each row
+            n_estimators: Number of trees in Random Forest
+            layout: Feature layout of the columns
+            cv: Cross-validate for the reported accuracy
+            
+        Returns:
+            Training metrics dict, as from train()
+        """
+        start = time.perf_counter()
+        
+        y = np.asarray(y)
+        self.users = sorted(set(y.tolist()))
+        if len(self.users) < 2:
+            raise ValueError("Need at least 2 users to train classifier")
+        
+        self.feature_names = get_feature_names(layout)
+        sparse = issparse(X)
+        self.sparse = sparse
+        
+        timings = {'prepare': time.perf_counter() - start}
+        
+        # Scale features; sparse input can only be scaled, not centered,
+        # which leaves tree splits unchanged
+        stage = time.perf_counter()
+        self.scaler = StandardScaler(with_mean=not sparse)
         X_scaled = self.scaler.fit_transform(X)
+        timings['scale'] = time.perf_counter() - stage
         
         # Train Random Forest
         self.classifier = RandomForestClassifier(
@@ -94,24 +210,115 @@ class KeystrokeAuthenticator:
             min_samples_split=2,
             min_samples_leaf=1,
             random_state=42,
-            class_weight='balanced'
+            class_weight='balanced',
+            n_jobs=self.n_jobs
         )
+        stage = time.perf_counter()
         self.classifier.fit(X_scaled, y)
+        timings['fit'] = time.perf_counter() - stage
+        
+        stage = time.perf_counter()
+        self.engine = compile_forest(self.classifier, self.scaler)
+        self.verifiers = {}
         self._is_trained = True
+        timings['compile'] = time.perf_counter() - stage
+        
+        metrics = {
+            'n_users': len(self.users),
+            'n_samples': X.shape[0],
+            'cv_accuracy': None,
+            'cv_std': None,
+            'feature_importance': self._get_feature_importance()
+        }
         
         # Calculate metrics
-        cv_scores = cross_val_score(
-            self.classifier, X_scaled, y, cv=min(3, len(y))
-        )
+        if cv:
+            stage = time.perf_counter()
+            metrics.update(self._cross_validate(X_scaled, y))
+            timings['cv'] = time.perf_counter() - stage
+        
+        timings['total'] = time.perf_counter() - start
+        metrics['timings'] = timings
+        return metrics
+    
+    def cross_validate(self, user_features: dict[str, list[KeystrokeFeatures]]) -> dict:
+        """
+        Cross-validate the trained configuration on user keystroke data.
+        
+        Lets callers train with cv=False and compute the accuracy later,
+        e.g. off the request path.
+        
+        Returns:
+            Dict with 'cv_accuracy' and 'cv_std'
+        """
+        if not self.is_trained:
+            raise RuntimeError("Model not trained. Call train() first.")
+        
+        samples = [f for user in sorted(user_features) for f in user_features[user]]
+        y = np.array([user for user in sorted(user_features) for _ in user_features[user]])
+        X = stack_features(samples, sparse=self.sparse)
+        
+        return self._cross_validate(self.scaler.transform(X), y)
+    
+    def _cross_validate(self, X_scaled, y: np.ndarray) -> dict:
+        """Run the folds in parallel, splitting the workers between them."""
+        folds = min(3, len(y))
+        n_workers = joblib.effective_n_jobs(self.n_jobs)
+        fold_jobs = min(folds, n_workers)
+        
+        estimator = clone(self.classifier).set_params(n_jobs=max(1, n_workers // fold_jobs))
+        cv_scores = cross_val_score(estimator, X_scaled, y, cv=folds, n_jobs=fold_jobs)
         
         return {
-            'n_users': len(self.users),
-            'n_samples': len(X),
             'cv_accuracy': float(np.mean(cv_scores)),
-            'cv_std': float(np.std(cv_scores)),
-            'feature_importance': self._get_feature_importance()
+            'cv_std': float(np.std(cv_scores))
         }
     
+    @property
+    def classes(self) -> np.ndarray:
+        """Users in the column order of predict_batch probabilities."""
+        if not self.verifiers:
+            return self.engine.classes
+        return np.array([*self.engine.classes, *self.verifiers])
+    
+    def predict_batch(self, X) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Predict user identities for a matrix of feature vectors.
+        
+        Scores through the compiled NumPy forest (scaling folded in) in a
+        single pass; labels are the argmax of the probabilities, exactly
+        as RandomForestClassifier.predict derives them.
+        
+        Args:
+            X: (n_samples, n_features) feature matrix, dense or sparse
+            
+        Returns:
+            Tuple of (predicted users, confidences, probability matrix);
+            probability columns follow the classes property
+        """
+        if not self.is_trained:
+            raise RuntimeError("Model not trained. Call train() first.")
+        
+        if self.engine is None:
+            self.engine = compile_forest(self.classifier, self.scaler)
+        probabilities = self.engine.predict_proba(X)
+        
+        if self.verifiers:
+            # Each verifier claims P(user | x); the forest's users share
+            # the probability that none of the enrolled users typed x
+            scores = np.column_stack([
+                verifier.predict_proba(X)[:, 1] for verifier in self.verifiers.values()
+            ])
+            unclaimed = np.prod(1.0 - scores, axis=1, keepdims=True)
+            probabilities = np.hstack([probabilities * unclaimed, scores])
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+        
+        best = np.argmax(probabilities, axis=1)
+        labels = self.classes[best]
+        confidences = probabilities[np.arange(len(best)), best]
+        
+        return labels, confidences, probabilities
+    
     def predict(self, features: KeystrokeFeatures) -> PredictionResult:
         """
         Predict user identity from keystroke features.
@@ -122,30 +329,123 @@ class KeystrokeAuthenticator:
         Returns:
             PredictionResult with user, confidence, and probabilities
         """
+        X = stack_features([features], sparse=self.sparse)
+        labels, confidences, probabilities = self.predict_batch(X)
+        
+        # Build probability dict
+        prob_dict = dict(zip(self.classes, probabilities[0].tolist()))
+        
+        return PredictionResult(
+            predicted_user=labels[0],
+            confidence=float(confidences[0]),
+            all_probabilities=prob_dict
+        )
+    
+    def enroll(
+        self,
+        username: str,
+        user_features: dict[str, list[KeystrokeFeatures]],
+        n_estimators: int = 25
+    ) -> dict:
+        """
+        Add a user without refitting the main forest.
+        
+        Fits a one-vs-rest verifier forest for the new user against a
+        sample of everyone else's data, reusing the existing scaler and
+        forest. Every consolidate_every enrollments the model is instead
+        retrained from scratch, and the metrics include how far the
+        incremental model had drifted from the full retrain.
+        
+        Args:
+            username: Newly registered user; must be in user_features
+            user_features: Dict mapping username to list of feature samples
+            n_estimators: Number of trees in the verifier forest
+            
+        Returns:
+            Enrollment metrics dict, or the train() metrics plus 'drift'
+            when the enrollment triggered a consolidation
+        """
         if not self.is_trained:
             raise RuntimeError("Model not trained. Call train() first.")
+        if username in self.users:
+            raise ValueError(f"User '{username}' is already enrolled")
         
-        # Prepare features
-        X = features.to_vector().reshape(1, -1)
-        X_scaled = self.scaler.transform(X)
+        if len(self.verifiers) + 1 >= self.consolidate_every:
+            return self.consolidate(user_features)
         
-        # Predict
-        predicted_user = self.classifier.predict(X_scaled)[0]
-        probabilities = self.classifier.predict_proba(X_scaled)[0]
+        positives = user_features[username]
+        negatives = [
+            features
+            for user, samples in user_features.items() if user != username
+            for features in samples
+        ]
+        limit = NEGATIVES_PER_POSITIVE * len(positives)
+        if len(negatives) > limit:
+            rng = np.random.default_rng(42)
+            negatives = [negatives[i] for i in rng.choice(len(negatives), limit, replace=False)]
         
-        # Build probability dict
-        prob_dict = {
-            user: float(prob) 
-            for user, prob in zip(self.classifier.classes_, probabilities)
+        X = stack_features(positives + negatives, sparse=self.sparse)
+        y = np.arange(X.shape[0]) < len(positives)
+        
+        verifier = RandomForestClassifier(
+            n_estimators=n_estimators,
+            max_depth=10,
+            random_state=42,
+            class_weight='balanced',
+            n_jobs=self.n_jobs
+        )
+        verifier.fit(self.scaler.transform(X), y)
+        
+        self.verifiers[username] = compile_forest(verifier, self.scaler)
+        self.users.append(username)
+        
+        return {
+            'n_users': len(self.users),
+            'n_samples': X.shape[0],
+            'incremental_users': len(self.verifiers),
+            'consolidated': False
         }
+    
+    def consolidate(self, user_features: dict[str, list[KeystrokeFeatures]]) -> dict:
+        """
+        Retrain from scratch, folding incrementally enrolled users into the forest.
         
-        confidence = max(probabilities)
+        The 'drift' entry compares the incremental model with the retrained
+        one on all enrolled samples: how often they agree, their accuracy,
+        and the mean change in the probability given to the true user.
         
-        return PredictionResult(
-            predicted_user=predicted_user,
-            confidence=confidence,
-            all_probabilities=prob_dict
-        )
+        Returns:
+            train() metrics dict with 'drift' and 'consolidated' added
+        """
+        samples = [f for user in sorted(user_features) for f in user_features[user]]
+        truth = np.array([user for user in sorted(user_features) for _ in user_features[user]])
+        X = stack_features(samples, sparse=self.sparse)
+        
+        def score(authenticator: 'KeystrokeAuthenticator') -> tuple[np.ndarray, np.ndarray]:
+            labels, _, probabilities = authenticator.predict_batch(X)
+            columns = {user: i for i, user in enumerate(authenticator.classes)}
+            known = np.array([user in columns for user in truth])
+            true_probability = np.zeros(len(truth))
+            true_probability[known] = probabilities[
+                np.flatnonzero(known), [columns[user] for user in truth[known]]
+            ]
+            return labels, true_probability
+        
+        incremental_users = len(self.verifiers)
+        before_labels, before_probability = score(self)
+        
+        metrics = self.train(user_features)
+        after_labels, after_probability = score(self)
+        
+        metrics['consolidated'] = True
+        metrics['drift'] = {
+            'incremental_users': incremental_users,
+            'agreement': float(np.mean(before_labels == after_labels)),
+            'incremental_accuracy': float(np.mean(before_labels == truth)),
+            'full_accuracy': float(np.mean(after_labels == truth)),
+            'mean_probability_shift': float(np.mean(np.abs(after_probability - before_probability)))
+        }
+        return metrics
     
     def _get_feature_importance(self) -> dict[str, float]:
         """Get feature importance scores from trained model."""
@@ -153,33 +453,60 @@ class KeystrokeAuthenticator:
             return {}
         
         importances = self.classifier.feature_importances_
-        names = get_feature_names()
+        names = self.feature_names
         
         return {
             name: float(imp) 
             for name, imp in zip(names, importances)
         }
     
-    def save(self, path: Optional[Path] = None) -> None:
-        """Save trained model to disk."""
+    def to_payload(self) -> dict:
+        """Everything needed to restore the trained model, for joblib.dump."""
         if not self.is_trained:
             raise RuntimeError("Cannot save untrained model")
         
-        save_path = path or self.model_path
-        save_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        model_data = {
+        return {
             'classifier': self.classifier,
             'scaler': self.scaler,
-            'users': self.users
+            'engine': self.engine,
+            'users': self.users,
+            'feature_names': self.feature_names,
+            'verifiers': self.verifiers,
+            'sparse': self.sparse
         }
+    
+    def restore(self, model_data: dict) -> None:
+        """Restore state from a to_payload() dict."""
+        self.classifier = model_data['classifier']
+        self.scaler = model_data['scaler']
+        self.users = model_data['users']
+        self.feature_names = model_data.get('feature_names') or get_feature_names()
+        self.sparse = model_data.get('sparse', False)
+        self.engine = model_data.get('engine') or compile_forest(self.classifier, self.scaler)
+        self.verifiers = model_data.get('verifiers', {})
+        self._is_trained = True
+    
+    def save(self, path: Optional[Path] = None) -> None:
+        """Save trained model to disk, replacing any previous file atomically."""
+        model_data = self.to_payload()
         
-        joblib.dump(model_data, save_path)
+        save_path = path or self.model_path
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        temp_path = save_path.with_name(f'.{save_path.name}.{os.getpid()}.tmp')
+        joblib.dump(model_data, temp_path)
+        os.replace(temp_path, save_path)
     
-    def load(self, path: Optional[Path] = None) -> bool:
+    def load(self, path: Optional[Path] = None, mmap_mode: Optional[str] = None) -> bool:
         """
         Load trained model from disk.
         
+        Args:
+            path: Model file; defaults to model_path
+            mmap_mode: Passed to joblib.load; 'r' memory-maps the compiled
+                forest's arrays so processes loading the same file share
+                those pages (the sklearn estimator is still unpickled)
+        
         Returns:
             True if loaded successfully, False otherwise
         """
@@ -189,48 +516,212 @@ class KeystrokeAuthenticator:
             return False
         
         try:
-            model_data = joblib.load(load_path)
-            self.classifier = model_data['classifier']
-            self.scaler = model_data['scaler']
-            self.users = model_data['users']
-            self._is_trained = True
+            self.restore(joblib.load(load_path, mmap_mode=mmap_mode))
             return True
         except Exception:
             return False
 
 
+class TemplateVerifier:
+    """
+    1:1 verifier scoring a sample against the claimed user's template.
+    
+    Each template is a RunningProfile (per-feature mean, spread and count).
+    The detector is a scaled Manhattan distance: the mean over features
+    seen in both the sample and the template of |x - mean| / spread. Both
+    verifying and enrolling cost O(features) and touch only one user.
+    """
+    
+    def __init__(
+        self,
+        threshold: float = VERIFY_THRESHOLD,
+        layout: FeatureLayout = DEFAULT_LAYOUT
+    ):
+        self.threshold = threshold
+        self.layout = layout
+        self.templates: dict[str, RunningProfile] = {}
+    
+    def __contains__(self, username: str) -> bool:
+        return username in self.templates
+    
+    def fit(self, user_features: dict[str, list[KeystrokeFeatures]]) -> None:
+        """Build templates for every user, replacing any existing ones."""
+        self.templates = {
+            user: RunningProfile.from_vectors(stack_features(samples), self.layout)
+            for user, samples in user_features.items() if samples
+        }
+    
+    def enroll(self, username: str, samples: list[KeystrokeFeatures]) -> RunningProfile:
+        """
+        Fold samples into one user's template, creating it if needed.
+        
+        Returns:
+            The user's updated template
+        """
+        template = self.templates.get(username)
+        if template is None:
+            template = self.templates[username] = RunningProfile(self.layout)
+        for features in samples:
+            template.update(features)
+        return template
+    
+    def distance(self, username: str, features: KeystrokeFeatures) -> tuple[float, int]:
+        """
+        Scaled Manhattan distance from a sample to a user's template.
+        
+        Returns:
+            Tuple of (mean scaled deviation, number of features compared);
+            the distance is inf when no feature could be compared
+        """
+        template = self.templates.get(username)
+        if template is None:
+            raise KeyError(f"No template enrolled for user '{username}'")
+        
+        x = features.to_vector().astype(np.float64)
+        usable = (x != 0) & (template.count >= 2)
+        n_features = int(usable.sum())
+        if not n_features:
+            return float('inf'), 0
+        
+        mean = template.mean[usable]
+        spread = np.maximum(template.std()[usable], MIN_RELATIVE_SPREAD * np.abs(mean))
+        deviations = np.abs(x[usable] - mean) / spread
+        return float(deviations.mean()), n_features
+    
+    def verify(self, username: str, features: KeystrokeFeatures) -> VerificationResult:
+        """
+        Accept or reject a claimed identity.
+        
+        Args:
+            username: Claimed user
+            features: Extracted keystroke features of the attempt
+            
+        Returns:
+            VerificationResult with the decision and its distance
+        """
+        distance, n_features = self.distance(username, features)
+        return VerificationResult(
+            claimed_user=username,
+            accepted=distance <= self.threshold,
+            distance=distance,
+            n_features=n_features
+        )
+    
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            'threshold': self.threshold,
+            'templates': {user: t.to_dict() for user, t in self.templates.items()}
+        }
+    
+    @classmethod
+    def from_dict(
+        cls,
+        data: dict,
+        layout: FeatureLayout = DEFAULT_LAYOUT
+    ) -> 'TemplateVerifier':
+        """Create from dictionary."""
+        verifier = cls(data.get('threshold', VERIFY_THRESHOLD), layout)
+        verifier.templates = {
+            user: RunningProfile.from_dict(t, layout)
+            for user, t in data.get('templates', {}).items()
+        }
+        return verifier
+
+
+class DatasetCache:
+    """
+    Thread-safe, process-wide cache of loaded user datasets.
+    
+    Entries are keyed by path and revalidated on every get() against the
+    mtime and size of the watched files plus a per-path generation counter
+    that in-process writers bump, so repeated reads are served from memory
+    and the data is only re-read after a real write. Cached datasets are
+    shared between callers and must be treated as read-only.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[Path, tuple[tuple, object]] = {}
+        self._generations: dict[Path, int] = {}
+        self._load_locks: dict[Path, threading.Lock] = {}
+    
+    def get(self, path: Path, loader: Callable[[], object], watch: Iterable[Path] = ()):
+        """
+        Return the cached dataset for path, loading it if stale.
+        
+        Args:
+            path: Cache key, and a file whose changes invalidate the entry
+            loader: Produces the dataset on a miss
+            watch: Further files whose changes invalidate the entry
+        """
+        key = Path(path).resolve()
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        
+        # One loader per path; concurrent callers wait and share its result
+        with load_lock:
+            signature = self._signature(key, [key, *watch])
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+            
+            data = loader()
+            with self._lock:
+                self._entries[key] = (signature, data)
+            return data
+    
+    def invalidate(self, path: Path) -> None:
+        """Mark path's entry stale; call after writing to it."""
+        key = Path(path).resolve()
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+    
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+    
+    def _signature(self, key: Path, paths: list[Path]) -> tuple:
+        """Generation plus (mtime, size) of each watched file; None if missing."""
+        stats = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stats.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stats.append(None)
+        with self._lock:
+            return self._generations.get(key, 0), tuple(stats)
+
+
+DATASET_CACHE = DatasetCache()
+
+
 def load_users_from_json(json_path: Path) -> dict[str, list[KeystrokeFeatures]]:
     """
     Load user keystroke data from JSON file.
     
+    The file is streamed user by user (see iter_users_json), so peak
+    memory is the result plus one user record rather than the parsed
+    document as well.
+    
     Args:
         json_path: Path to users.json
         
     Returns:
         Dict mapping username to list of KeystrokeFeatures
     """
-    with open(json_path, 'r') as f:
-        data = json.load(f)
-    
-    user_features = {}
-    
-    for username, user_data in data.get('users', {}).items():
-        samples = []
-        for sample in user_data.get('samples', []):
-            features = KeystrokeFeatures.from_dict(sample.get('features', {}))
-            samples.append(features)
-        
-        if samples:
-            user_features[username] = samples
-    
-    return user_features
+    return dict(iter_users_json(json_path))
 
 
 def save_user_to_json(
     json_path: Path, 
     username: str, 
     display_name: str,
-    features_list: list[KeystrokeFeatures]
+    features_list: list[KeystrokeFeatures],
+    sparse: bool = False
 ) -> None:
     """
     Save or update user keystroke data in JSON file.
@@ -240,9 +731,11 @@ def save_user_to_json(
         username: User identifier
         display_name: User display name
         features_list: List of keystroke feature samples
+        sparse: Store only observed (non-zero) features per sample
     """
     # Load existing data
-    if json_path.exists():
+    previous = source_signature(json_path)
+    if previous is not None:
         with open(json_path, 'r') as f:
             data = json.load(f)
     else:
@@ -251,11 +744,272 @@ def save_user_to_json(
     # Add/update user
     data['users'][username] = {
         'display_name': display_name,
-        'samples': [{'features': f.to_dict()} for f in features_list]
+        'samples': [
+            {'features': f.to_dict(skip_missing=sparse)} for f in features_list
+        ]
     }
     
     # Save
     json_path.parent.mkdir(parents=True, exist_ok=True)
     with open(json_path, 'w') as f:
         json.dump(data, f, indent=2)
+    DATASET_CACHE.invalidate(json_path)
+    
+    # Keep the binary feature store in step without regenerating it
+    feature_store = FeatureStore(json_path)
+    if not feature_store.update_user(username, features_list, previous):
+        feature_store.rebuild(load_users_from_json(json_path))
+
+
+def open_feature_store(json_path: Path) -> FeatureStore:
+    """
+    Memory-mapped feature store of a users.json file.
+    
+    Rebuilt first if it is missing or does not mirror the file on disk,
+    e.g. after users.json was edited by hand.
+    """
+    feature_store = FeatureStore(json_path)
+    if not feature_store.is_current():
+        user_features = load_users_from_json(json_path) if json_path.exists() else {}
+        feature_store.rebuild(user_features)
+    return feature_store
+
+
+class UserStore(ABC):
+    """
+    Storage backend for enrolled users and their feature samples.
+    
+    Subclasses implement the abstract per-user primitives; load_users()
+    gathers everything for training from iter_samples().
+    """
+    
+    @abstractmethod
+    def user_exists(self, username: str) -> bool:
+        """Check whether a user is enrolled."""
+    
+    @abstractmethod
+    def count_users(self) -> int:
+        """Number of enrolled users."""
+    
+    @abstractmethod
+    def save_user(
+        self,
+        username: str,
+        display_name: str,
+        features_list: list[KeystrokeFeatures]
+    ) -> None:
+        """Save or replace a user and their samples."""
+    
+    @abstractmethod
+    def iter_samples(
+        self,
+        username: Optional[str] = None
+    ) -> Iterator[tuple[str, KeystrokeFeatures]]:
+        """Yield (username, features) for every sample, or one user's samples."""
+    
+    def load_users(self) -> dict[str, list[KeystrokeFeatures]]:
+        """
+        Load every user's samples.
+        
+        Returns:
+            Dict mapping username to list of KeystrokeFeatures
+        """
+        user_features = {}
+        for username, features in self.iter_samples():
+            user_features.setdefault(username, []).append(features)
+        return user_features
+    
+    def cached_users(self) -> dict[str, list[KeystrokeFeatures]]:
+        """
+        load_users() served from DATASET_CACHE until the store changes.
+        
+        The result is shared with other callers; do not modify it.
+        """
+        paths = self.watched_paths()
+        if not paths:
+            return self.load_users()
+        return DATASET_CACHE.get(paths[0], self.load_users, paths[1:])
+    
+    def watched_paths(self) -> list[Path]:
+        """Files whose changes mean the stored data changed; empty disables caching."""
+        return []
+
+
+class JsonUserStore(UserStore):
+    """UserStore over a users.json document, read through its feature store."""
+    
+    def __init__(self, json_path: Path):
+        self.json_path = json_path
+    
+    def user_exists(self, username: str) -> bool:
+        return username in self.load_users()
+    
+    def count_users(self) -> int:
+        return len(self.load_users())
+    
+    def save_user(
+        self,
+        username: str,
+        display_name: str,
+        features_list: list[KeystrokeFeatures]
+    ) -> None:
+        save_user_to_json(self.json_path, username, display_name, features_list)
+    
+    def iter_samples(
+        self,
+        username: Optional[str] = None
+    ) -> Iterator[tuple[str, KeystrokeFeatures]]:
+        for user, samples in self.load_users().items():
+            if username is None or user == username:
+                for features in samples:
+                    yield user, features
+    
+    def load_users(self) -> dict[str, list[KeystrokeFeatures]]:
+        if not self.json_path.exists():
+            return {}
+        return open_feature_store(self.json_path).load_users()
+    
+    def watched_paths(self) -> list[Path]:
+        return [self.json_path]
 
+
+class SQLiteUserStore(UserStore):
+    """
+    UserStore in a SQLite database in WAL mode.
+    
+    Users and samples live in separate tables, indexed by username and by
+    owning user, so existence checks and counts never scan samples and a
+    registration only writes that user's rows. Each sample's features are
+    stored as sparse JSON, as in users.json.
+    """
+    
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
+            display_name TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS samples (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            features TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS samples_user_id ON samples(user_id);
+        CREATE TABLE IF NOT EXISTS metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        INSERT OR IGNORE INTO metadata (key, value) VALUES ('version', '2.0.0');
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self._SCHEMA)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; one per call keeps the store safe across threads."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    # Like the JSON store, a user only counts once they have samples
+    _HAS_SAMPLES = "EXISTS (SELECT 1 FROM samples WHERE samples.user_id = users.id)"
+    
+    def user_exists(self, username: str) -> bool:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT 1 FROM users WHERE username = ? AND {self._HAS_SAMPLES} LIMIT 1",
+                (username,)
+            ).fetchone()
+        return row is not None
+    
+    def count_users(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM users WHERE {self._HAS_SAMPLES}"
+            ).fetchone()[0]
+    
+    def save_user(
+        self,
+        username: str,
+        display_name: str,
+        features_list: list[KeystrokeFeatures]
+    ) -> None:
+        self.save_users([(username, display_name, features_list)])
+    
+    def save_users(
+        self,
+        records: Iterable[tuple[str, str, list[KeystrokeFeatures]]]
+    ) -> int:
+        """
+        Save or replace many users in a single transaction.
+        
+        Args:
+            records: (username, display_name, features_list) tuples
+            
+        Returns:
+            Number of users written
+        """
+        n_users = 0
+        with closing(self._connect()) as conn, conn:
+            for username, display_name, features_list in records:
+                conn.execute(
+                    """
+                    INSERT INTO users (username, display_name, created_at) VALUES (?, ?, ?)
+                    ON CONFLICT(username) DO UPDATE SET display_name = excluded.display_name
+                    """,
+                    (username, display_name, time.time())
+                )
+                user_id = conn.execute(
+                    "SELECT id FROM users WHERE username = ?", (username,)
+                ).fetchone()[0]
+                conn.execute("DELETE FROM samples WHERE user_id = ?", (user_id,))
+                conn.executemany(
+                    "INSERT INTO samples (user_id, features) VALUES (?, ?)",
+                    [
+                        (user_id, json.dumps(f.to_dict(skip_missing=True), separators=(',', ':')))
+                        for f in features_list
+                    ]
+                )
+                n_users += 1
+        DATASET_CACHE.invalidate(self.db_path)
+        return n_users
+    
+    def iter_samples(
+        self,
+        username: Optional[str] = None
+    ) -> Iterator[tuple[str, KeystrokeFeatures]]:
+        query = "SELECT u.username, s.features FROM samples s JOIN users u ON u.id = s.user_id"
+        params: tuple = ()
+        if username is not None:
+            query += " WHERE u.username = ?"
+            params = (username,)
+        query += " ORDER BY s.user_id, s.id"
+        
+        with closing(self._connect()) as conn:
+            for user, features in conn.execute(query, params):
+                yield user, KeystrokeFeatures.from_dict(json.loads(features))
+    
+    def watched_paths(self) -> list[Path]:
+        # Committed writes land in the WAL file until a checkpoint
+        return [self.db_path, self.db_path.with_name(self.db_path.name + '-wal')]
+
+
+def migrate_json_to_sqlite(json_path: Path, db_path: Path) -> int:
+    """
+    Copy every user in a users.json file into a SQLite store.
+    
+    The file is streamed user by user (see iter_user_records_json), and
+    users without samples are skipped. Users already in the database are
+    replaced; the JSON file is left as is.
+    
+    Returns:
+        Number of users migrated
+    """
+    return SQLiteUserStore(db_path).save_users(iter_user_records_json(json_path))
@@ -0,0 +1,241 @@
+"""
+Nearest-Neighbour Index Module
+
+Identification backend for large user populations. Every enrollment
+vector is stored in a random-projection LSH index (p-stable projections,
+several hash tables); a query gathers the samples sharing a bucket with it,
+ranks them by exact Euclidean distance and returns the closest users. Cost
+depends on bucket occupancy rather than on the number of users, users can
+be inserted without rebuilding, and the index saves to a single .npz file.
+"""
+
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from .features import KeystrokeFeatures, stack_features
+
+
+# Hash tables, and projections concatenated into each table's bucket key
+N_TABLES = 12
+N_PROJECTIONS = 6
+
+# Bucket width along each projection, in standardized feature units
+BUCKET_WIDTH = 4.0
+
+# Below this many candidate samples per requested user, neighbouring
+# buckets (one projection off) are probed as well
+MIN_CANDIDATES_PER_USER = 4
+
+
+class NeighborIndex:
+    """
+    LSH index of enrollment vectors answering top-k user queries.
+    
+    Vectors are standardized with the center and scale fitted when the
+    index is built, so each feature contributes comparably to distances.
+    """
+    
+    def __init__(
+        self,
+        center: np.ndarray,
+        scale: np.ndarray,
+        n_tables: int = N_TABLES,
+        n_projections: int = N_PROJECTIONS,
+        bucket_width: float = BUCKET_WIDTH,
+        seed: int = 42
+    ):
+        self.center = np.asarray(center, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.n_tables = n_tables
+        self.n_projections = n_projections
+        self.bucket_width = bucket_width
+        self.seed = seed
+        
+        rng = np.random.default_rng(seed)
+        n_features = len(self.center)
+        self._projections = rng.standard_normal(
+            (n_features, n_tables * n_projections)
+        ).astype(np.float32)
+        self._offsets = rng.uniform(0, bucket_width, n_tables * n_projections).astype(np.float32)
+        
+        self.users: list[str] = []
+        self._user_index: dict[str, int] = {}
+        self._vectors = np.empty((0, n_features), dtype=np.float32)
+        self._owners = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self._tables: list[defaultdict[bytes, list[int]]] = [
+            defaultdict(list) for _ in range(n_tables)
+        ]
+    
+    def __len__(self) -> int:
+        """Number of indexed samples."""
+        return self._size
+    
+    @classmethod
+    def from_user_features(
+        cls,
+        user_features: dict[str, list[KeystrokeFeatures]],
+        **kwargs
+    ) -> 'NeighborIndex':
+        """
+        Build an index over every user's enrollment samples.
+        
+        Args:
+            user_features: Dict mapping username to list of feature samples,
+                e.g. from load_users_from_json
+            **kwargs: Index parameters (n_tables, n_projections, ...)
+        """
+        users = [user for user, samples in user_features.items() if samples]
+        X = stack_features([f for user in users for f in user_features[user]])
+        owners = np.repeat(np.arange(len(users)), [len(user_features[user]) for user in users])
+        return cls.from_matrix(X, owners, users, **kwargs)
+    
+    @classmethod
+    def from_matrix(
+        cls,
+        X: np.ndarray,
+        owners: np.ndarray,
+        users: list[str],
+        **kwargs
+    ) -> 'NeighborIndex':
+        """
+        Build an index over a matrix of enrollment vectors.
+        
+        Args:
+            X: (n_samples, n_features) raw feature matrix, e.g. memory-mapped
+                from a FeatureStore
+            owners: Index into users of each row's user; negative rows
+                (a FeatureStore's dead rows) are skipped
+            users: Usernames
+            **kwargs: Index parameters (n_tables, n_projections, ...)
+        """
+        live = np.flatnonzero(np.asarray(owners) >= 0)
+        X = np.asarray(X)[live]
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        
+        index = cls(X.mean(axis=0), scale, **kwargs)
+        index.users = list(users)
+        index._user_index = {user: i for i, user in enumerate(index.users)}
+        index._add(index._standardize(X), np.asarray(owners)[live].astype(np.int32))
+        return index
+    
+    def insert(self, username: str, samples: list[KeystrokeFeatures]) -> None:
+        """Add samples for a new or existing user; no rebuild needed."""
+        if not samples:
+            return
+        
+        user = self._user_index.get(username)
+        if user is None:
+            user = self._user_index[username] = len(self.users)
+            self.users.append(username)
+        
+        X = self._standardize(stack_features(samples))
+        self._add(X, np.full(len(X), user, dtype=np.int32))
+    
+    def query(self, features: KeystrokeFeatures, k: int = 5) -> list[tuple[str, float]]:
+        """
+        Find the users with the nearest enrollment samples.
+        
+        Args:
+            features: Extracted keystroke features to identify
+            k: Number of users to return
+        
+        Returns:
+            Up to k (username, distance) pairs, nearest first; a user's
+            distance is that of their closest sample
+        """
+        x = self._standardize(features.to_vector().reshape(1, -1))[0]
+        keys = self._keys(x.reshape(1, -1))[0]
+        
+        candidates = self._candidates(keys)
+        if len(candidates) < MIN_CANDIDATES_PER_USER * k:
+            candidates = self._candidates(keys, probe=True)
+        if not candidates:
+            return []
+        
+        rows = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+        distances = np.sqrt(((self._vectors[rows] - x) ** 2).sum(axis=1))
+        
+        # Closest sample per user, then the k closest users
+        order = np.argsort(distances, kind='stable')
+        owners = self._owners[rows[order]]
+        _, first = np.unique(owners, return_index=True)
+        best = np.sort(first)[:k]
+        
+        return [(self.users[owners[i]], float(distances[order[i]])) for i in best]
+    
+    def save(self, path: Path) -> None:
+        """Save the index to an .npz file; buckets are rehashed on load."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            center=self.center,
+            scale=self.scale,
+            params=np.array([self.n_tables, self.n_projections, self.seed]),
+            bucket_width=self.bucket_width,
+            users=np.array(self.users, dtype=str),
+            vectors=self._vectors[:self._size],
+            owners=self._owners[:self._size]
+        )
+    
+    @classmethod
+    def load(cls, path: Path) -> 'NeighborIndex':
+        """Load an index saved with save()."""
+        with np.load(path, allow_pickle=False) as data:
+            n_tables, n_projections, seed = (int(v) for v in data['params'])
+            index = cls(
+                data['center'],
+                data['scale'],
+                n_tables=n_tables,
+                n_projections=n_projections,
+                bucket_width=float(data['bucket_width']),
+                seed=seed
+            )
+            index.users = data['users'].tolist()
+            index._user_index = {user: i for i, user in enumerate(index.users)}
+            
+            index._add(data['vectors'], data['owners'])
+        return index
+    
+    def _standardize(self, X: np.ndarray) -> np.ndarray:
+        """Center and scale raw feature vectors."""
+        return ((X - self.center) / self.scale).astype(np.float32)
+    
+    def _keys(self, X: np.ndarray) -> np.ndarray:
+        """(n, n_tables, n_projections) integer bucket coordinates."""
+        hashed = np.floor((X @ self._projections + self._offsets) / self.bucket_width)
+        return hashed.astype(np.int32).reshape(len(X), self.n_tables, self.n_projections)
+    
+    def _add(self, X: np.ndarray, owners: np.ndarray) -> None:
+        """Append standardized vectors with their owning user indices and bucket them."""
+        start, end = self._size, self._size + len(X)
+        if end > len(self._vectors):
+            capacity = max(end, 2 * len(self._vectors), 256)
+            grown_vectors = np.empty((capacity, self._vectors.shape[1]), dtype=np.float32)
+            grown_vectors[:start] = self._vectors[:start]
+            grown_owners = np.empty(capacity, dtype=np.int32)
+            grown_owners[:start] = self._owners[:start]
+            self._vectors, self._owners = grown_vectors, grown_owners
+        
+        self._vectors[start:end] = X
+        self._owners[start:end] = owners
+        self._size = end
+        
+        for row, keys in zip(range(start, end), self._keys(X)):
+            for table, key in zip(self._tables, keys):
+                table[key.tobytes()].append(row)
+    
+    def _candidates(self, keys: np.ndarray, probe: bool = False) -> set[int]:
+        """Rows sharing a bucket with keys, optionally one step off in each projection."""
+        candidates = set()
+        for table, key in zip(self._tables, keys):
+            probes = [key]
+            if probe:
+                steps = np.vstack([np.eye(len(key), dtype=np.int32), -np.eye(len(key), dtype=np.int32)])
+                probes.extend(key + steps)
+            for probe_key in probes:
+                candidates.update(table.get(probe_key.tobytes(), ()))
+        return candidates
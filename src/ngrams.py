@@ -0,0 +1,123 @@
+"""
+N-gram Matching Module
+
+Aho-Corasick automaton over key codes for matching a configurable
+vocabulary of n-grams in a single pass over a keystroke stream.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from .capture import KeyVocabulary, normalize_key
+
+
+def ngram_keys(ngram: str) -> tuple[str, ...]:
+    """
+    Split an n-gram into normalized key names, one key per character.
+    
+    'th' -> ('t', 'h'), 'e ' -> ('e', 'space')
+    """
+    return tuple(normalize_key(key) for key in ngram)
+
+
+class NGramAutomaton:
+    """
+    Aho-Corasick automaton matching n-grams of key codes.
+    
+    Built once per n-gram vocabulary and compiled to a dense DFA over a
+    compressed alphabet (the keys that occur in any pattern, plus one symbol
+    for every other key). Each keystroke costs one table lookup however many
+    n-grams are tracked, so growing the vocabulary does not multiply the
+    cost of extraction.
+    """
+    
+    def __init__(self, ngrams: list[str], vocabulary: KeyVocabulary):
+        patterns = [ngram_keys(ngram) for ngram in ngrams]
+        if any(len(p) < 2 for p in patterns):
+            raise ValueError("N-grams must span at least two keys")
+        
+        self.lengths = np.array([len(p) for p in patterns], dtype=np.intp)
+        self.max_length = int(self.lengths.max()) if len(patterns) else 0
+        
+        # Alphabet compression: symbol 0 stands for keys in no pattern
+        codes = sorted({vocabulary.intern(key) for p in patterns for key in p})
+        self._symbol_of_code = np.zeros(max(codes, default=-1) + 1, dtype=np.intp)
+        self._symbol_of_code[codes] = np.arange(1, len(codes) + 1)
+        n_symbols = len(codes) + 1
+        
+        # Trie
+        goto: list[dict[int, int]] = [{}]
+        outputs: list[list[int]] = [[]]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for key in pattern:
+                symbol = int(self._symbol_of_code[vocabulary.intern(key)])
+                if symbol not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][symbol] = len(goto) - 1
+                state = goto[state][symbol]
+            outputs[state].append(index)
+        
+        # Breadth-first failure links, folded into a dense transition table
+        delta = [[0] * n_symbols for _ in goto]
+        fail = [0] * len(goto)
+        queue = deque()
+        for symbol, state in goto[0].items():
+            delta[0][symbol] = state
+            queue.append(state)
+        
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for symbol in range(n_symbols):
+                child = goto[state].get(symbol)
+                if child is None:
+                    delta[state][symbol] = delta[fail[state]][symbol]
+                else:
+                    fail[child] = delta[fail[state]][symbol]
+                    delta[state][symbol] = child
+                    queue.append(child)
+        
+        self._symbol_list = self._symbol_of_code.tolist()
+        self._delta = delta
+        self._outputs = [tuple(o) for o in outputs]
+        self.n_states = len(goto)
+    
+    def symbols(self, codes: np.ndarray) -> list[int]:
+        """Map key codes to automaton symbols."""
+        codes = np.asarray(codes, dtype=np.intp)
+        known = codes < len(self._symbol_of_code)
+        symbols = np.zeros(len(codes), dtype=np.intp)
+        symbols[known] = self._symbol_of_code[codes[known]]
+        return symbols.tolist()
+    
+    def step(self, state: int, code: int) -> tuple[int, tuple[int, ...]]:
+        """Advance by one key code, returning (new state, matched n-gram indices)."""
+        symbol = self._symbol_list[code] if code < len(self._symbol_list) else 0
+        state = self._delta[state][symbol]
+        return state, self._outputs[state]
+    
+    def scan(self, codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find every n-gram occurrence in a key code sequence in one pass.
+        
+        Returns:
+            Tuple of (end positions, n-gram indices) of all matches
+        """
+        delta = self._delta
+        outputs = self._outputs
+        ends: list[int] = []
+        matched: list[int] = []
+        
+        state = 0
+        for position, symbol in enumerate(self.symbols(codes)):
+            state = delta[state][symbol]
+            if outputs[state]:
+                for index in outputs[state]:
+                    ends.append(position)
+                    matched.append(index)
+        
+        return np.array(ends, dtype=np.intp), np.array(matched, dtype=np.intp)
+
@@ -0,0 +1,327 @@
+"""
+Model Registry Module
+
+Versioned on-disk storage for trained models. Each version is a directory
+holding the joblib payload and a JSON manifest (content hash, feature
+schema, creation time), and a CURRENT pointer file names the live version.
+Every write lands in a temporary path first and is renamed into place.
+Payloads are loaded memory-mapped: the compiled forest's node arrays stay
+file-backed, so processes serving the same version share those pages,
+while the sklearn estimator kept for retraining is unpickled into
+private memory in each process.
+
+Run with: python -m src.registry {list,rollback,prune} --root models/registry
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import joblib
+
+from .features import FEATURE_SCHEMA_VERSION
+from .featurestore import source_signature
+from .model import KeystrokeAuthenticator
+
+
+PAYLOAD_NAME = 'model.joblib'
+MANIFEST_NAME = 'manifest.json'
+CURRENT_NAME = 'CURRENT'
+VERSION_PREFIX = 'v'
+
+# Versions kept by default after each publish
+KEEP_VERSIONS = 10
+
+STAGING_PREFIX = '.staging-'
+
+# Seconds after which prune() treats a staging directory as abandoned
+STAGING_MAX_AGE = 3600
+
+# Payloads whose hash matched their manifest, with the [mtime_ns, size]
+# they had then; versions are immutable, so each is hashed once per process
+_VERIFIED: dict[Path, list[int]] = {}
+
+
+class RegistryError(Exception):
+    """Raised when a model version is missing, corrupt or incompatible."""
+
+
+def _file_sha256(path: Path) -> str:
+    """Hex SHA-256 of a file, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _schema_of(feature_names: list[str]) -> dict:
+    """Feature schema recorded in, and checked against, each manifest."""
+    return {
+        'version': FEATURE_SCHEMA_VERSION,
+        'n_features': len(feature_names),
+        'names_sha256': hashlib.sha256('\n'.join(feature_names).encode()).hexdigest()
+    }
+
+
+class ModelRegistry:
+    """
+    Directory of immutable model versions with an atomically switched pointer.
+    
+    Layout:
+        root/CURRENT               name of the live version
+        root/v000001/model.joblib  joblib payload (uncompressed, mmap-able)
+        root/v000001/manifest.json hash, schema and summary of the payload
+    
+    After each publish all but the newest keep versions are pruned (keep
+    None disables this); the CURRENT version is never removed.
+    """
+    
+    def __init__(self, root: Path, keep: Optional[int] = KEEP_VERSIONS):
+        self.root = Path(root)
+        self.keep = keep
+    
+    def versions(self) -> list[str]:
+        """Published versions, oldest first."""
+        if not self.root.exists():
+            return []
+        return sorted(
+            entry.name for entry in self.root.iterdir()
+            if entry.is_dir() and entry.name.startswith(VERSION_PREFIX)
+            and (entry / MANIFEST_NAME).exists()
+        )
+    
+    @property
+    def current_version(self) -> Optional[str]:
+        """Live version named by the CURRENT pointer, if any."""
+        try:
+            return (self.root / CURRENT_NAME).read_text().strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def manifest(self, version: str) -> dict:
+        """Read a version's manifest."""
+        try:
+            with open(self.root / version / MANIFEST_NAME, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise RegistryError(f"Model version '{version}' does not exist") from None
+    
+    def publish(self, authenticator: KeystrokeAuthenticator, activate: bool = True) -> str:
+        """
+        Store a trained model as a new version.
+        
+        The version directory is assembled under a temporary name and
+        renamed into place, so readers never observe a partial version.
+        
+        Args:
+            authenticator: Trained model to store
+            activate: Point CURRENT at the new version
+        
+        Returns:
+            Name of the new version
+        """
+        model_data = authenticator.to_payload()
+        self.root.mkdir(parents=True, exist_ok=True)
+        
+        staging = Path(tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=self.root))
+        try:
+            payload_path = staging / PAYLOAD_NAME
+            joblib.dump(model_data, payload_path)
+            
+            manifest = {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'sha256': _file_sha256(payload_path),
+                'size': payload_path.stat().st_size,
+                'feature_schema': _schema_of(authenticator.feature_names),
+                'users': authenticator.users
+            }
+            with open(staging / MANIFEST_NAME, 'w') as f:
+                json.dump(manifest, f, indent=2)
+            
+            # Concurrent publishers race for the next number; rename fails
+            # for the loser, who retries with the one after
+            while True:
+                version = self._next_version()
+                try:
+                    os.rename(staging, self.root / version)
+                    break
+                except OSError:
+                    if not (self.root / version).exists():
+                        raise
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        
+        # The manifest hash was just computed from this file
+        payload_path = (self.root / version / PAYLOAD_NAME).absolute()
+        _VERIFIED[payload_path] = source_signature(payload_path)
+        
+        if activate:
+            self.activate(version)
+        if self.keep is not None:
+            self.prune(self.keep)
+        return version
+    
+    def load(
+        self,
+        version: Optional[str] = None,
+        mmap: bool = True,
+        verify: bool = True
+    ) -> KeystrokeAuthenticator:
+        """
+        Load a version, by default the current one.
+        
+        Args:
+            version: Version to load; defaults to CURRENT
+            mmap: Memory-map the payload's arrays read-only
+            verify: Check the payload against the manifest hash; a payload
+                is only hashed the first time this process loads it
+        
+        Returns:
+            Trained KeystrokeAuthenticator
+        """
+        version = version or self.current_version
+        if version is None:
+            raise RegistryError(f"No model has been published to {self.root}")
+        
+        manifest = self.manifest(version)
+        payload_path = self.root / version / PAYLOAD_NAME
+        
+        schema = manifest.get('feature_schema', {})
+        if schema.get('version') != FEATURE_SCHEMA_VERSION:
+            raise RegistryError(
+                f"Model version '{version}' uses feature schema {schema.get('version')}, "
+                f"expected {FEATURE_SCHEMA_VERSION}"
+            )
+        if verify:
+            self._verify(version, payload_path, manifest['sha256'])
+        
+        # No model_path: a later save() must not overwrite the immutable payload
+        authenticator = KeystrokeAuthenticator()
+        try:
+            authenticator.restore(joblib.load(payload_path, mmap_mode='r' if mmap else None))
+        except Exception as e:
+            raise RegistryError(f"Model version '{version}' could not be loaded: {e}") from e
+        
+        if _schema_of(authenticator.feature_names) != schema:
+            raise RegistryError(f"Model version '{version}' does not match its manifest schema")
+        
+        return authenticator
+    
+    def _verify(self, version: str, payload_path: Path, sha256: str) -> None:
+        """Check a payload's hash unless it already passed unchanged."""
+        payload_path = payload_path.absolute()
+        signature = source_signature(payload_path)
+        if signature is not None and _VERIFIED.get(payload_path) == signature:
+            return
+        if signature is None or _file_sha256(payload_path) != sha256:
+            raise RegistryError(f"Model version '{version}' failed its integrity check")
+        _VERIFIED[payload_path] = signature
+    
+    def activate(self, version: str) -> None:
+        """Atomically point CURRENT at an existing version."""
+        self.manifest(version)
+        
+        temp_path = self.root / f'.{CURRENT_NAME}.{os.getpid()}.tmp'
+        temp_path.write_text(version + '\n')
+        os.replace(temp_path, self.root / CURRENT_NAME)
+    
+    def rollback(self, version: Optional[str] = None) -> str:
+        """
+        Re-activate an earlier version.
+        
+        Args:
+            version: Version to roll back to; defaults to the one published
+                just before the current version
+        
+        Returns:
+            Name of the now-current version
+        """
+        if version is None:
+            versions = self.versions()
+            current = self.current_version
+            older = [v for v in versions if current is None or v < current]
+            if not older:
+                raise RegistryError("No earlier model version to roll back to")
+            version = older[-1]
+        
+        self.activate(version)
+        return version
+    
+    def prune(self, keep: int) -> list[str]:
+        """
+        Delete all but the newest keep versions; CURRENT is always kept.
+        
+        Processes still serving a deleted version keep its memory-mapped
+        pages, which stay valid until unmapped. Staging directories left by
+        publishes that died before renaming are removed once they are older
+        than STAGING_MAX_AGE.
+        
+        Returns:
+            Names of the deleted versions
+        """
+        if keep < 1:
+            raise ValueError("keep must be at least 1")
+        
+        current = self.current_version
+        versions = self.versions()
+        newest = set(versions[-keep:])
+        removed = [v for v in versions if v not in newest and v != current]
+        for version in removed:
+            shutil.rmtree(self.root / version, ignore_errors=True)
+            _VERIFIED.pop((self.root / version / PAYLOAD_NAME).absolute(), None)
+        
+        cutoff = time.time() - STAGING_MAX_AGE
+        for entry in self.root.glob(STAGING_PREFIX + '*'):
+            try:
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+        return removed
+    
+    def _next_version(self) -> str:
+        """Name following the newest existing version."""
+        versions = self.versions()
+        number = int(versions[-1][len(VERSION_PREFIX):]) + 1 if versions else 1
+        return f'{VERSION_PREFIX}{number:06d}'
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect and roll back published models")
+    parser.add_argument('--root', type=Path, default=Path('models/registry'))
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="List published versions")
+    rollback = commands.add_parser('rollback', help="Re-activate an earlier version")
+    rollback.add_argument('version', nargs='?', help="Defaults to the previous version")
+    prune = commands.add_parser('prune', help="Delete old versions, never the current one")
+    prune.add_argument('--keep', type=int, default=KEEP_VERSIONS)
+    args = parser.parse_args(argv)
+    
+    registry = ModelRegistry(args.root, keep=None)
+    
+    if args.command == 'list':
+        current = registry.current_version
+        for version in registry.versions():
+            manifest = registry.manifest(version)
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version}  {manifest['created']}  {len(manifest['users'])} users")
+    elif args.command == 'prune':
+        for version in registry.prune(args.keep):
+            print(f"Deleted {version}")
+    else:
+        try:
+            print(f"Current version: {registry.rollback(args.version)}")
+        except RegistryError as e:
+            parser.exit(1, f"error: {e}\n")
+
+
+if __name__ == '__main__':
+    main()
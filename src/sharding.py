@@ -0,0 +1,352 @@
+"""
+Sharded Model Module
+
+Hierarchical identification for large user populations. Users are
+clustered by their aggregated typing profiles into shards of roughly
+users_per_shard users, each served by its own KeystrokeAuthenticator; a
+nearest-centroid router sends each sample to the few closest shards, so a
+prediction's cost tracks the shard size rather than the user count.
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import joblib
+from joblib import Parallel, delayed
+from scipy.sparse import csr_matrix
+from sklearn.cluster import KMeans
+
+from .features import KeystrokeFeatures, aggregate_features, stack_features
+from .model import KeystrokeAuthenticator, PredictionResult
+
+
+# Target number of users per shard when the shard count is chosen automatically
+USERS_PER_SHARD = 50
+
+# Shards scored per prediction
+TOP_SHARDS = 2
+
+
+def _train_shard(
+    user_features: dict[str, list[KeystrokeFeatures]],
+    n_estimators: int
+) -> KeystrokeAuthenticator:
+    """Train one shard's classifier; runs in a worker when shards train in parallel."""
+    authenticator = KeystrokeAuthenticator(n_jobs=1)
+    authenticator.train(user_features, n_estimators=n_estimators, cv=False)
+    return authenticator
+
+
+class ShardedAuthenticator:
+    """
+    Router plus per-shard classifiers with the KeystrokeAuthenticator API.
+    
+    The router holds one centroid per shard in standardized profile space.
+    A sample is scored by the top_shards nearest shards, and each shard's
+    probabilities are weighted by a softmax over negative centroid distance.
+    """
+    
+    def __init__(
+        self,
+        model_path: Optional[Path] = None,
+        users_per_shard: int = USERS_PER_SHARD,
+        top_shards: int = TOP_SHARDS,
+        n_jobs: int = -1
+    ):
+        self.model_path = model_path or Path('models/keystroke_shards.joblib')
+        self.users_per_shard = users_per_shard
+        self.top_shards = top_shards
+        self.n_jobs = n_jobs
+        
+        self.shards: list[KeystrokeAuthenticator] = []
+        self.shard_users: list[list[str]] = []
+        self.shard_of: dict[str, int] = {}
+        self.center: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        self._profile_sums: Optional[np.ndarray] = None
+        self._shard_sizes: Optional[np.ndarray] = None
+    
+    @property
+    def is_trained(self) -> bool:
+        """Check if every shard has been trained."""
+        return bool(self.shards) and all(shard.is_trained for shard in self.shards)
+    
+    @property
+    def users(self) -> list[str]:
+        """All users across shards."""
+        return list(self.shard_of)
+    
+    @property
+    def classes(self) -> np.ndarray:
+        """Users in the column order of predict_batch probabilities, shard by shard."""
+        return np.concatenate([shard.classes for shard in self.shards])
+    
+    @property
+    def centroids(self) -> np.ndarray:
+        """(n_shards, n_features) router centroids in standardized space."""
+        return self._profile_sums / self._shard_sizes[:, None]
+    
+    def train(
+        self,
+        user_features: dict[str, list[KeystrokeFeatures]],
+        n_shards: Optional[int] = None,
+        n_estimators: int = 100
+    ) -> dict:
+        """
+        Cluster users into shards and train every shard in parallel.
+        
+        Args:
+            user_features: Dict mapping username to list of feature samples
+            n_shards: Number of shards; by default users / users_per_shard
+            n_estimators: Number of trees in each shard's Random Forest
+        
+        Returns:
+            Training metrics dict
+        """
+        if len(user_features) < 2:
+            raise ValueError("Need at least 2 users to train classifier")
+        
+        users = sorted(user_features)
+        profiles = stack_features([aggregate_features(user_features[u]) for u in users])
+        
+        self.center = profiles.mean(axis=0)
+        self.scale = profiles.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        Z = self._standardize(profiles)
+        
+        if n_shards is None:
+            n_shards = round(len(users) / self.users_per_shard)
+        n_shards = max(1, min(n_shards, len(users) // 2))
+        
+        labels = KMeans(n_clusters=n_shards, n_init=3, random_state=42).fit_predict(Z)
+        labels = self._merge_singletons(Z, labels)
+        
+        self.shard_users = [[] for _ in range(labels.max() + 1)]
+        for user, label in zip(users, labels):
+            self.shard_users[label].append(user)
+        self.shard_of = {user: int(label) for user, label in zip(users, labels)}
+        
+        self._profile_sums = np.zeros((len(self.shard_users), Z.shape[1]))
+        np.add.at(self._profile_sums, labels, Z)
+        self._shard_sizes = np.bincount(labels).astype(np.float64)
+        
+        self.shards = Parallel(n_jobs=self.n_jobs)(
+            delayed(_train_shard)({u: user_features[u] for u in members}, n_estimators)
+            for members in self.shard_users
+        )
+        
+        return {
+            'n_users': len(users),
+            'n_shards': len(self.shards),
+            'shard_sizes': [len(members) for members in self.shard_users]
+        }
+    
+    def enroll(
+        self,
+        username: str,
+        user_features: dict[str, list[KeystrokeFeatures]],
+        n_estimators: int = 100
+    ) -> dict:
+        """
+        Add a user to its nearest shard and retrain only that shard.
+        
+        Args:
+            username: Newly registered user; must be in user_features
+            user_features: Feature samples for at least the shard's users
+            n_estimators: Number of trees in the shard's Random Forest
+        
+        Returns:
+            Enrollment metrics dict
+        """
+        if not self.is_trained:
+            raise RuntimeError("Model not trained. Call train() first.")
+        if username in self.shard_of:
+            raise ValueError(f"User '{username}' is already enrolled")
+        
+        z = self._standardize(aggregate_features(user_features[username]).to_vector())
+        shard = int(np.argmin(((self.centroids - z) ** 2).sum(axis=1)))
+        
+        members = self.shard_users[shard] + [username]
+        self.shards[shard] = _train_shard({u: user_features[u] for u in members}, n_estimators)
+        self.shard_users[shard] = members
+        self.shard_of[username] = shard
+        self._profile_sums[shard] += z
+        self._shard_sizes[shard] += 1
+        
+        return {
+            'n_users': len(self.shard_of),
+            'shard': shard,
+            'shard_size': len(members)
+        }
+    
+    def route(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Pick the shards to score for each sample.
+        
+        Returns:
+            Tuple of (n_samples, k) shard indices, nearest first, and their
+            softmax weights
+        """
+        Z = self._standardize(np.asarray(X, dtype=np.float64).reshape(len(X), -1))
+        centroids = self.centroids
+        squared = (
+            (Z ** 2).sum(axis=1, keepdims=True)
+            - 2 * Z @ centroids.T
+            + (centroids ** 2).sum(axis=1)
+        )
+        distances = np.sqrt(np.maximum(squared, 0.0))
+        
+        k = min(self.top_shards, len(self.shards))
+        nearest = np.argsort(distances, axis=1)[:, :k]
+        near = np.take_along_axis(distances, nearest, axis=1)
+        
+        weights = np.exp(near[:, :1] - near)
+        weights /= weights.sum(axis=1, keepdims=True)
+        return nearest, weights
+    
+    def predict_batch(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray, csr_matrix]:
+        """
+        Predict user identities for a dense matrix of feature vectors.
+        
+        Each shard scores only the rows routed to it.
+        
+        Returns:
+            Tuple of (predicted users, confidences, probability matrix).
+            Probability columns follow the classes property; each row holds
+            the weighted probabilities of the shards that scored it and is
+            empty elsewhere, so the matrix is sparse
+        """
+        if not self.is_trained:
+            raise RuntimeError("Model not trained. Call train() first.")
+        
+        X = np.asarray(X)
+        nearest, weights = self.route(X)
+        offsets = np.cumsum([0] + [len(shard.classes) for shard in self.shards])
+        
+        labels = np.empty(len(X), dtype=object)
+        confidences = np.full(len(X), -1.0)
+        entry_rows, entry_cols, entry_values = [], [], []
+        
+        for shard in np.unique(nearest):
+            rows, slot = np.nonzero(nearest == shard)
+            shard_labels, _, shard_probabilities = self.shards[shard].predict_batch(X[rows])
+            shard_probabilities = shard_probabilities * weights[rows, slot][:, None]
+            scores = shard_probabilities.max(axis=1)
+            better = scores > confidences[rows]
+            labels[rows[better]] = shard_labels[better]
+            confidences[rows[better]] = scores[better]
+            
+            n_classes = shard_probabilities.shape[1]
+            entry_rows.append(np.repeat(rows, n_classes))
+            entry_cols.append(np.tile(np.arange(offsets[shard], offsets[shard + 1]), len(rows)))
+            entry_values.append(shard_probabilities.ravel())
+        
+        probabilities = csr_matrix(
+            (np.concatenate(entry_values), (np.concatenate(entry_rows), np.concatenate(entry_cols))),
+            shape=(len(X), offsets[-1])
+        )
+        return labels.astype(str), confidences, probabilities
+    
+    def predict(self, features: KeystrokeFeatures) -> PredictionResult:
+        """
+        Predict user identity from keystroke features.
+        
+        all_probabilities covers the users of the shards that were scored.
+        """
+        if not self.is_trained:
+            raise RuntimeError("Model not trained. Call train() first.")
+        
+        x = features.to_vector().reshape(1, -1)
+        nearest, weights = self.route(x)
+        
+        probabilities = {}
+        for shard, weight in zip(nearest[0], weights[0]):
+            model = self.shards[shard]
+            _, _, shard_probabilities = model.predict_batch(x)
+            for user, probability in zip(model.classes, shard_probabilities[0]):
+                probabilities[str(user)] = float(probability * weight)
+        
+        predicted_user = max(probabilities, key=probabilities.get)
+        return PredictionResult(
+            predicted_user=predicted_user,
+            confidence=probabilities[predicted_user],
+            all_probabilities=probabilities
+        )
+    
+    def save(self, path: Optional[Path] = None) -> None:
+        """Save router and shards to disk, replacing any previous file atomically."""
+        if not self.is_trained:
+            raise RuntimeError("Cannot save untrained model")
+        
+        save_path = path or self.model_path
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        model_data = {
+            'shards': [shard.to_payload() for shard in self.shards],
+            'shard_users': self.shard_users,
+            'center': self.center,
+            'scale': self.scale,
+            'profile_sums': self._profile_sums,
+            'shard_sizes': self._shard_sizes
+        }
+        temp_path = save_path.with_name(f'.{save_path.name}.{os.getpid()}.tmp')
+        joblib.dump(model_data, temp_path)
+        os.replace(temp_path, save_path)
+    
+    def load(self, path: Optional[Path] = None, mmap_mode: Optional[str] = None) -> bool:
+        """
+        Load router and shards from disk.
+        
+        Returns:
+            True if loaded successfully, False otherwise
+        """
+        load_path = path or self.model_path
+        
+        if not load_path.exists():
+            return False
+        
+        try:
+            model_data = joblib.load(load_path, mmap_mode=mmap_mode)
+            self.shards = []
+            for payload in model_data['shards']:
+                shard = KeystrokeAuthenticator(n_jobs=1)
+                shard.restore(payload)
+                self.shards.append(shard)
+            self.shard_users = model_data['shard_users']
+            self.shard_of = {
+                user: shard for shard, members in enumerate(self.shard_users) for user in members
+            }
+            self.center = model_data['center']
+            self.scale = model_data['scale']
+            self._profile_sums = np.array(model_data['profile_sums'])
+            self._shard_sizes = np.array(model_data['shard_sizes'])
+            return True
+        except Exception:
+            return False
+    
+    def _standardize(self, X: np.ndarray) -> np.ndarray:
+        """Center and scale profiles (or samples) for the router."""
+        return (X - self.center) / self.scale
+    
+    def _merge_singletons(self, Z: np.ndarray, labels: np.ndarray) -> np.ndarray:
+        """
+        Move users of one-user clusters to the nearest larger cluster and
+        renumber clusters densely; a shard classifier needs two users.
+        """
+        labels = labels.copy()
+        while True:
+            sizes = np.bincount(labels)
+            single = np.flatnonzero(sizes == 1)
+            if not len(single) or np.count_nonzero(sizes >= 2) == 0:
+                break
+            
+            viable = np.flatnonzero(sizes >= 2)
+            centroids = np.array([Z[labels == c].mean(axis=0) for c in viable])
+            for cluster in single:
+                row = np.flatnonzero(labels == cluster)[0]
+                labels[row] = viable[np.argmin(((centroids - Z[row]) ** 2).sum(axis=1))]
+        
+        _, labels = np.unique(labels, return_inverse=True)
+        return labels
@@ -0,0 +1,206 @@
+"""
+Background Training Module
+
+Runs model training off the request path. Retrain requests are debounced
+and coalesced into single-flight jobs on a process pool; each finished job
+publishes a new version to the model registry, which readers pick up with
+one atomic reference swap, so predictions are served from the previous
+model until the new one is ready.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from .model import KeystrokeAuthenticator, UserStore
+from .registry import ModelRegistry, RegistryError
+
+
+# Seconds to wait for further retrain requests before starting a job
+DEBOUNCE_SECONDS = 2.0
+
+
+def _refresh_model(store: UserStore, registry_root: str) -> tuple[Optional[str], dict]:
+    """
+    Bring the registry's current model up to date with the user store.
+    
+    Runs in a worker process. New users are enrolled incrementally into
+    the current model when possible; otherwise the model is trained from
+    scratch. The result is published as a new registry version.
+    
+    Returns:
+        Tuple of (published version, training or enrollment metrics);
+        (None, {}) if there was nothing to train
+    """
+    user_data = store.load_users()
+    if len(user_data) < 2:
+        return None, {}
+    
+    registry = ModelRegistry(Path(registry_root))
+    try:
+        authenticator = registry.load(mmap=False)
+    except RegistryError:
+        authenticator = KeystrokeAuthenticator()
+    new_users = sorted(set(user_data) - set(authenticator.users))
+    
+    if authenticator.is_trained and set(authenticator.users) <= set(user_data):
+        if not new_users:
+            return None, {}
+        for username in new_users:
+            # A consolidating enroll() retrains on every user in user_data,
+            # which enrolls the rest of new_users along the way
+            if username not in authenticator.users:
+                metrics = authenticator.enroll(username, user_data)
+    else:
+        metrics = authenticator.train(user_data)
+    
+    return registry.publish(authenticator), metrics
+
+
+class TrainingService:
+    """
+    Single-flight background trainer publishing versioned models.
+    
+    At most one training job runs at a time. Requests arriving within the
+    debounce window, or while a job is running, are coalesced into one
+    follow-up job.
+    """
+    
+    def __init__(
+        self,
+        store: UserStore,
+        registry: ModelRegistry,
+        debounce: float = DEBOUNCE_SECONDS,
+        executor: Optional[ProcessPoolExecutor] = None
+    ):
+        self.store = store
+        self.registry = registry
+        self.debounce = debounce
+        self.version: Optional[str] = None
+        self.last_metrics: dict = {}
+        self.last_error: Optional[BaseException] = None
+        
+        # Spawn rather than fork: the caller (e.g. the Streamlit server) is
+        # multithreaded, and forking it with NumPy/BLAS thread pools already
+        # initialised can hang the worker
+        self._executor = executor or ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context('spawn')
+        )
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._timer: Optional[threading.Timer] = None
+        self._running: Optional[Future] = None
+        self._pending = False
+        
+        self._authenticator = KeystrokeAuthenticator()
+        self.refresh()
+    
+    @property
+    def authenticator(self) -> KeystrokeAuthenticator:
+        """The currently published model; never mutated after publication."""
+        return self._authenticator
+    
+    @property
+    def is_busy(self) -> bool:
+        """Whether a job is scheduled, running or pending."""
+        with self._lock:
+            return self._timer is not None or self._running is not None or self._pending
+    
+    def refresh(self) -> None:
+        """
+        Swap to the registry's current version if it changed elsewhere,
+        e.g. after a rollback; keeps the current model if it can't be loaded.
+        """
+        version = self.registry.current_version
+        if version is None or version == self.version:
+            return
+        try:
+            self._publish(version)
+        except RegistryError as e:
+            self.last_error = e
+    
+    def request_retrain(self, debounce: Optional[float] = None) -> None:
+        """
+        Ask for the model to be refreshed from the user store.
+        
+        Cheap and safe to call from any thread; repeated calls within the
+        debounce window restart it and collapse into a single job.
+        """
+        delay = self.debounce if debounce is None else debounce
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._launch)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until no job is scheduled, running or pending.
+        
+        Returns:
+            True if the service went idle, False on timeout
+        """
+        with self._idle:
+            return self._idle.wait_for(
+                lambda: self._timer is None and self._running is None and not self._pending,
+                timeout
+            )
+    
+    def shutdown(self) -> None:
+        """Cancel any scheduled job and stop the worker pool."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = False
+        self._executor.shutdown(wait=True)
+    
+    def _launch(self) -> None:
+        """Start a job now, or mark one pending if a job is already running."""
+        with self._lock:
+            self._timer = None
+            if self._running is not None:
+                self._pending = True
+                return
+            self._pending = False
+            try:
+                job = self._executor.submit(
+                    _refresh_model, self.store, str(self.registry.root)
+                )
+            except Exception as e:
+                # E.g. a spawned worker that cannot start
+                self.last_error = e
+                self._idle.notify_all()
+                return
+            self._running = job
+        job.add_done_callback(self._on_done)
+    
+    def _on_done(self, future: Future) -> None:
+        """Publish the finished job's model and start any coalesced follow-up."""
+        try:
+            version, metrics = future.result()
+            if version is not None:
+                self._publish(version)
+            self.last_metrics = metrics
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+        
+        with self._lock:
+            self._running = None
+            if not self._pending:
+                self._idle.notify_all()
+                return
+        
+        self._launch()
+    
+    def _publish(self, version: str) -> None:
+        """Load a registry version and make it the served model."""
+        authenticator = self.registry.load(version)
+        # Rebinding the reference is atomic; readers holding the old
+        # model finish their predictions against it
+        self._authenticator = authenticator
+        self.version = version
@@ -0,0 +1,126 @@
+"""
+Capture Parser Tests
+
+Checks that the array-based parsers (parse_js_keystroke_data_bulk and the
+packed wire format) build the same sessions as the stateful
+parse_js_keystroke_data on randomized payloads.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.capture import (
+    pack_keystroke_data,
+    parse_js_keystroke_data,
+    parse_js_keystroke_data_bulk,
+    parse_packed_keystroke_data,
+    unpack_keystroke_data
+)
+
+
+KEYS = ['e', 'a', 't', 'h', 'E', 'A', ' ', 'Shift', 'Backspace', 'Enter', 'ß', '😀']
+EVENT_TYPES = ['keydown', 'keyup', 'keydown', 'keyup', 'keypress', '']
+
+
+def random_payload(rng: random.Random, n_events: int) -> list[dict]:
+    """
+    Events with key repeats, stray keyups, unknown types and missing keys.
+    
+    Times are whole milliseconds plus three decimals, sometimes starting
+    at zero.
+    """
+    payload = []
+    time_ms = rng.choice([0.0, 1_000.0 + rng.randint(0, 10_000)])
+    for _ in range(n_events):
+        time_ms += rng.choice([0, 0.001, rng.randint(1, 400) + rng.randint(0, 999) / 1000])
+        event = {'type': rng.choice(EVENT_TYPES), 'time': round(time_ms, 3)}
+        if rng.random() > 0.05:
+            event['key'] = rng.choice(KEYS)
+        payload.append(event)
+    return payload
+
+
+def assert_same_session(expected, actual, atol: float = 0.0) -> None:
+    assert len(actual) == len(expected)
+    np.testing.assert_array_equal(actual.key_codes, expected.key_codes)
+    np.testing.assert_allclose(actual.press_times, expected.press_times, rtol=0, atol=atol)
+    np.testing.assert_allclose(actual.release_times, expected.release_times, rtol=0, atol=atol)
+    
+    for attr in ('start_time', 'end_time'):
+        if getattr(expected, attr) is None:
+            assert getattr(actual, attr) is None
+        else:
+            assert getattr(actual, attr) == pytest.approx(getattr(expected, attr), abs=atol)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_bulk_parser_matches_stateful_parser(seed):
+    rng = random.Random(seed)
+    payload = random_payload(rng, rng.randint(0, 300))
+    
+    assert_same_session(parse_js_keystroke_data(payload), parse_js_keystroke_data_bulk(payload))
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_packed_parser_matches_stateful_parser(seed):
+    rng = random.Random(seed)
+    payload = random_payload(rng, rng.randint(0, 300))
+    
+    # The wire format carries microsecond timestamps
+    assert_same_session(
+        parse_js_keystroke_data(payload),
+        parse_packed_keystroke_data(pack_keystroke_data(payload)),
+        atol=1e-9
+    )
+
+
+def test_parsers_agree_on_empty_payload():
+    expected = parse_js_keystroke_data([])
+    assert_same_session(expected, parse_js_keystroke_data_bulk([]))
+    assert_same_session(expected, parse_packed_keystroke_data(pack_keystroke_data([])))
+
+
+def test_key_repeat_and_stray_keyup():
+    payload = [
+        {'key': 'a', 'type': 'keyup', 'time': 1000.0},
+        {'key': 'a', 'type': 'keydown', 'time': 1010.0},
+        {'key': 'a', 'type': 'keydown', 'time': 1040.0},
+        {'key': 'b', 'type': 'keypress', 'time': 1050.0},
+        {'key': 'a', 'type': 'keyup', 'time': 1100.0},
+        {'key': 'a', 'type': 'keyup', 'time': 1120.0}
+    ]
+    
+    session = parse_js_keystroke_data_bulk(payload)
+    assert len(session) == 1
+    assert session.press_times[0] == pytest.approx(1.010)
+    assert session.release_times[0] == pytest.approx(1.100)
+    assert_same_session(parse_js_keystroke_data(payload), session)
+
+
+def test_packed_times_round_half_up_like_js():
+    # Each time is a tie in microseconds; Math.round in the capture JS
+    # gives the expected values
+    times_ms = [0.0025, 0.0035, 0.0005, 1.0005, 10.0625, 12.5005]
+    expected_us = [3, 4, 1, 1001, 10063, 12501]
+    payload = [
+        {'key': 'a', 'type': 'keydown' if i % 2 == 0 else 'keyup', 'time': time_ms}
+        for i, time_ms in enumerate(times_ms)
+    ]
+    
+    _, _, timestamps = unpack_keystroke_data(pack_keystroke_data(payload))
+    np.testing.assert_array_equal(np.rint(timestamps * 1e6).astype(np.int64), expected_us)
+
+
+def test_zero_timestamp_is_kept():
+    payload = [
+        {'key': 'a', 'type': 'keydown', 'time': 0},
+        {'key': 'a', 'type': 'keyup', 'time': 80.0}
+    ]
+    
+    expected = parse_js_keystroke_data(payload)
+    assert expected.press_times[0] == 0.0
+    assert expected.start_time == 0.0
+    assert_same_session(expected, parse_js_keystroke_data_bulk(payload))
+    assert_same_session(expected, parse_packed_keystroke_data(pack_keystroke_data(payload)), atol=1e-9)
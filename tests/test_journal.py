@@ -0,0 +1,55 @@
+"""
+Journal Store Tests
+
+Checks that a registration torn partway through its append is dropped
+whole, leaving the user's earlier samples and later appends intact.
+"""
+
+import pytest
+
+from src.features import KeystrokeFeatures
+from src.journal import JournalUserStore
+
+
+def samples(*speeds: float) -> list[KeystrokeFeatures]:
+    return [KeystrokeFeatures(dwell_times={'e': 0.1}, typing_speed=speed) for speed in speeds]
+
+
+def typing_speeds(store: JournalUserStore, username: str) -> list[float]:
+    return [f.typing_speed for user, f in store.iter_samples(username)]
+
+
+@pytest.mark.parametrize('fraction', [0.0, 0.25, 0.5, 0.75, 1.0])
+def test_torn_append_leaves_user_unchanged(tmp_path, fraction):
+    store = JournalUserStore(tmp_path)
+    store.save_user('alice', 'Alice', samples(0.25, 0.5))
+    size = store.journal_path.stat().st_size
+    
+    # Re-register alice, then cut the append short as a crash would
+    store.save_user('alice', 'Alice', samples(0.75))
+    # Keep at least one byte, and at most all but the newline
+    appended = store.journal_path.stat().st_size - size
+    with open(store.journal_path, 'r+b') as f:
+        f.truncate(size + max(1, min(int(appended * fraction), appended - 1)))
+    
+    reopened = JournalUserStore(tmp_path)
+    assert typing_speeds(reopened, 'alice') == [0.25, 0.5]
+    
+    # The next append terminates the torn line and is read normally
+    reopened.save_user('bob', 'Bob', samples(0.125))
+    assert typing_speeds(reopened, 'alice') == [0.25, 0.5]
+    assert typing_speeds(reopened, 'bob') == [0.125]
+    assert reopened.count_users() == 2
+    
+    reopened.compact()
+    assert typing_speeds(JournalUserStore(tmp_path), 'alice') == [0.25, 0.5]
+
+
+def test_reregistration_replaces_samples(tmp_path):
+    store = JournalUserStore(tmp_path)
+    store.save_user('alice', 'Alice', samples(0.25, 0.5))
+    store.save_user('alice', 'Alice', samples(0.75))
+    
+    assert typing_speeds(store, 'alice') == [0.75]
+    store.compact()
+    assert typing_speeds(JournalUserStore(tmp_path), 'alice') == [0.75]